@@ -1,6 +1,7 @@
 import streamlit as st
 import time
 import os
+import uuid
 from dotenv import load_dotenv
 
 # Load logic
@@ -11,6 +12,8 @@ from src.agents.miner import MinerAgent
 from src.agents.validator import ValidatorAgent
 from src.report_generator import ReportGenerator
 from src.agents.architect import ArchitectAgent
+from src.research_job import ResearchJob, JobRegistry
+from src.multi_market import MultiMarketResearch
 
 # Page Config
 st.set_page_config(page_title="MicroSaaS Validator", page_icon="🕵️", layout="wide")
@@ -24,16 +27,40 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- INITIALIZATION ---
+load_dotenv()
 if "state" not in st.session_state:
     st.session_state.state = None # To store ResearchState
-if "verifier" not in st.session_state:
-    load_dotenv()
-    st.session_state.verifier = VerifierAgent()
-    st.session_state.hunter = None
-    st.session_state.miner = None
-    st.session_state.validator = None
-    st.session_state.architect = ArchitectAgent()
-    st.session_state.reporter = ReportGenerator()
+
+# Agents are built once per server process and shared by every session
+@st.cache_resource
+def get_verifier():
+    return VerifierAgent()
+
+@st.cache_resource
+def get_architect():
+    return ArchitectAgent()
+
+@st.cache_resource
+def get_reporter():
+    return ReportGenerator()
+
+@st.cache_resource
+def get_market_agents(country_code: str):
+    return HunterAgent(country_code=country_code), MinerAgent(country_code=country_code), ValidatorAgent(country_code=country_code)
+
+@st.cache_resource
+def get_job_registry():
+    return JobRegistry()
+
+# Stage outputs are cached by their inputs across reruns and sessions
+@st.cache_data(ttl=3600, show_spinner=False)
+def verify_niche(raw_niche: str):
+    return get_verifier().verify_niche(raw_niche)
+
+@st.cache_data(ttl=6 * 3600, show_spinner=False)
+def hunt(niche: str, country_code: str):
+    hunter, _, _ = get_market_agents(country_code)
+    return hunter.hunt(niche)
 
 # --- SIDEBAR (Configuration) ---
 with st.sidebar:
@@ -42,18 +69,70 @@ with st.sidebar:
     status = "✅ Connected" if api_key else "❌ Missing Key"
     st.info(f"SerpApi Status: {status}")
     
-    country_code = st.selectbox("Target Market", ["in", "us", "uk", "ca"], index=0, format_func=lambda x: x.upper())
+    markets = st.multiselect("Target Market(s)", ["in", "us", "uk", "ca"], default=["in"], format_func=lambda x: x.upper())
+    country_code = markets[0] if markets else "in"
+    if len(markets) > 1:
+        st.caption("Several markets run as one comparison; all hunted competitors are mined.")
     
     if st.button("Reset / New Search"):
         st.session_state.state = None
+        st.session_state.hunted = None
+        st.session_state.multi_key = None
+        st.session_state.export_paths = None
         st.rerun()
 
 # --- MAIN UI ---
 st.title("🕵️ MicroSaaS Validator Engine")
 st.markdown("##### *Turn Vague Ideas into Validated Gold*")
 
+# MULTI-MARKET: one niche compared across several markets
+if st.session_state.get("multi_key"):
+    niche, codes = st.session_state.multi_key
+    st.header(f"🌍 Market Comparison: {niche}")
+
+    # Same registry as single runs, so sessions asking for the same comparison share it
+    multi_job_key = ("multi", niche, codes)
+    new_multi_job = lambda: MultiMarketResearch(niche, list(codes), architect=get_architect(), reporter=get_reporter())
+    job = get_job_registry().get_or_start(multi_job_key, new_multi_job)
+    st.progress(int(job.progress * 100))
+    st.text(job.message)
+
+    if not job.done:
+        time.sleep(0.5)
+        st.rerun()
+    elif job.error:
+        st.error(f"Research failed: {job.error}")
+        if st.button("🔁 Retry"):
+            get_job_registry().retry(multi_job_key, new_multi_job)
+            st.rerun()
+    else:
+        comparison = job.comparison
+        if comparison["best_market"]:
+            st.success(f"**Strongest Market:** {comparison['best_market'].upper()}")
+        st.subheader("Demand by Market")
+        st.dataframe([
+            {"Market": m["country_code"].upper(), "Competitors": len(m["competitors"]), "Pains": m["pain_points"],
+             "Top Keyword": m["top_keyword"], "Top Score": m["top_score"], "Mean Score": m["mean_score"]}
+            for m in comparison["markets"]
+        ], use_container_width=True)
+
+        st.subheader("Competitor Presence")
+        st.dataframe([
+            {"Competitor": e["name"], **{c.upper(): ("✅" if c in e["markets"] else "") for c in codes}}
+            for e in comparison["competitors"].values()
+        ], use_container_width=True)
+
+        if job.product_spec:
+            st.subheader(f"🏗️ Blueprint: {job.product_spec.mvp_name}")
+            st.caption(job.product_spec.tagline)
+            st.info(f"**Hero Copy:** {job.product_spec.marketing_hook}")
+
+        with open(job.report_path, "rb") as file:
+            st.download_button("📄 Download Comparison (Markdown)", data=file,
+                               file_name=os.path.basename(job.report_path), mime="text/markdown")
+
 # PHASE 1: INPUT & VERIFICATION
-if st.session_state.state is None:
+elif st.session_state.state is None:
     st.info("💡 **Tip:** Use the formula '[Specific Process] software for [Specific Industry]'")
     raw_niche = st.text_input("Enter your Niche Idea:", placeholder="e.g. HACCP compliance software for commercial kitchens")
     
@@ -62,21 +141,23 @@ if st.session_state.state is None:
             st.warning("Please enter a niche.")
         else:
             with st.spinner("🤖 Verifying Intent..."):
-                feedback = st.session_state.verifier.verify_niche(raw_niche)
+                feedback = verify_niche(raw_niche)
                 
-            if feedback['status'] == 'valid':
+            if feedback['status'] == 'valid' and len(markets) > 1:
+                # Verified once for every market
+                st.success("✅ Prompt Verified! Comparing markets...")
+                st.session_state.multi_key = (raw_niche, tuple(markets))
+                st.rerun()
+
+            elif feedback['status'] == 'valid':
                 st.success("✅ Prompt Verified! Starting Research...")
                 # Initialize State
                 st.session_state.state = ResearchState(
-                    project_id=f"proj_{int(time.time())}",
+                    project_id=f"proj_{int(time.time())}_{uuid.uuid4().hex[:6]}",
                     niche=raw_niche,
                     country_code=country_code,
                     current_stage=ResearchStage.HUNTING
                 )
-                # Initialize Agents with correct Country
-                st.session_state.hunter = HunterAgent(country_code=country_code)
-                st.session_state.miner = MinerAgent(country_code=country_code)
-                st.session_state.validator = ValidatorAgent(country_code=country_code)
                 st.rerun()
                 
             else:
@@ -90,8 +171,9 @@ elif st.session_state.state.current_stage == ResearchStage.HUNTING:
     st.header(f"🔍 Phase 1: Market Scan ({st.session_state.state.niche})")
     
     with st.spinner("🦅 Hunter Agent is scouring the web..."):
-        competitors = st.session_state.hunter.hunt(st.session_state.state.niche)
+        competitors = hunt(st.session_state.state.niche, st.session_state.state.country_code)
         st.session_state.state.competitors = competitors
+        st.session_state.hunted = competitors # Full list, so the analyst can come back and re-select
         st.session_state.state.current_stage = ResearchStage.HUNTING_REVIEW
         st.rerun()
 
@@ -100,18 +182,20 @@ elif st.session_state.state.current_stage == ResearchStage.HUNTING_REVIEW:
     st.header("📋 Phase 2: Competitor Review")
     st.write("The Hunter found these existing solutions. Uncheck any irrelevant ones.")
     
-    # Render Checkboxes
-    comps = st.session_state.state.competitors
+    # Render Checkboxes (the full hunted list; current selection pre-checked)
+    comps = st.session_state.get("hunted") or st.session_state.state.competitors
+    selected_names = {c.name for c in st.session_state.state.competitors}
     if not comps:
         st.warning("No competitors found. Attempting to proceed might fail.")
     
     selected_indices = []
     for i, comp in enumerate(comps):
-        is_checked = st.checkbox(f"{comp.name}", value=True, key=f"comp_{i}")
+        is_checked = st.checkbox(f"{comp.name}", value=comp.name in selected_names, key=f"comp_{i}")
         if is_checked:
             selected_indices.append(i)
             
     st.write(f"**{len(selected_indices)}** competitors selected for Deep Dive.")
+    st.caption("Competitors mined earlier are reused; only newly selected ones are mined.")
     
     col1, col2 = st.columns(2)
     with col1:
@@ -130,43 +214,47 @@ elif st.session_state.state.current_stage == ResearchStage.HUNTING_REVIEW:
 elif st.session_state.state.current_stage == ResearchStage.MINING:
     st.header("⛏️ Phase 3: Deep Research & Architecture")
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    # 1. MINER
-    status_text.text("Miner Agent is extracting pains...")
-    pains = st.session_state.miner.mine(st.session_state.state.competitors)
-    st.session_state.state.pain_points = pains
-    progress_bar.progress(33)
+    state = st.session_state.state
     
-    # 2. VALIDATOR
-    status_text.text("Validator Agent is scoring demand...")
-    ideas = st.session_state.validator.validate(pains)
-    st.session_state.state.final_ideas = ideas
-    progress_bar.progress(66)
+    # Miner -> Validator -> Architect -> Report run on a background thread.
+    # Sessions with the same inputs attach to the same job instead of re-running it.
+    job_key = (state.niche, state.country_code, tuple(c.name for c in state.competitors))
+    _, miner, validator = get_market_agents(state.country_code)
+    new_job = lambda: ResearchJob(state, miner, validator, get_architect(), get_reporter())
+    job = get_job_registry().get_or_start(job_key, new_job)
     
-    # 3. ARCHITECT (New Step)
-    if ideas:
-        status_text.text("Architect Agent is drafting the Blueprint...")
-        # We pick the top idea to architect
-        winning_idea = ideas[0]
-        spec = st.session_state.architect.create_spec(winning_idea, pains)
-        st.session_state.state.product_spec = spec
+    st.progress(int(job.progress * 100))
+    st.text(job.message)
     
-    progress_bar.progress(100)
-    
-    # Save Report
-    report_path = st.session_state.reporter.save_report(st.session_state.state)
-    st.session_state.report_path = report_path
-    
-    st.session_state.state.current_stage = ResearchStage.COMPLETED
-    st.rerun()
+    if not job.done:
+        time.sleep(0.5)
+        st.rerun()
+    elif job.error:
+        st.error(f"Research failed: {job.error}")
+        if st.button("🔁 Retry"):
+            get_job_registry().retry(job_key, new_job)
+            st.rerun()
+    else:
+        state.pain_points = job.state.pain_points
+        state.final_ideas = job.state.final_ideas
+        state.product_spec = job.state.product_spec
+        st.session_state.report_path = job.report_path
+        # The job may belong to another session's project id; its files are named after it
+        st.session_state.export_paths = get_reporter().paths_for(job.state)
+        
+        state.current_stage = ResearchStage.COMPLETED
+        st.rerun()
 
 # PHASE 5: FINAL REPORT
 elif st.session_state.state.current_stage == ResearchStage.COMPLETED:
     st.balloons()
     st.header("🏆 Analysis Complete!")
     
+    # Iterate on the shortlist: only the delta gets mined and validated again
+    if st.button("⬅️ Edit Competitor Selection"):
+        st.session_state.state.current_stage = ResearchStage.HUNTING_REVIEW
+        st.rerun()
+    
     # Top Section: The Winning Idea
     if st.session_state.state.final_ideas:
         winner = st.session_state.state.final_ideas[0]
@@ -206,11 +294,22 @@ elif st.session_state.state.current_stage == ResearchStage.COMPLETED:
         for comp in st.session_state.state.competitors:
             st.write(f"- [{comp.name}]({comp.url})")
 
-    # Download Button
+    # Download Buttons
     with open(st.session_state.report_path, "rb") as file:
         st.download_button(
             label="📄 Download Full Report (Markdown)",
             data=file,
             file_name=os.path.basename(st.session_state.report_path),
             mime="text/markdown"
-        )
\ No newline at end of file
+        )
+
+    exports = st.session_state.get("export_paths") or get_reporter().paths_for(st.session_state.state)
+    col_json, col_csv = st.columns(2)
+    if os.path.exists(exports["json"]):
+        with open(exports["json"], "rb") as file:
+            col_json.download_button("🧾 Download Data (JSON)", data=file,
+                                     file_name=os.path.basename(exports["json"]), mime="application/json")
+    if os.path.exists(exports["ideas_csv"]):
+        with open(exports["ideas_csv"], "rb") as file:
+            col_csv.download_button("📊 Download Ideas (CSV)", data=file,
+                                    file_name=os.path.basename(exports["ideas_csv"]), mime="text/csv")
\ No newline at end of file
@@ -0,0 +1,30 @@
+from dotenv import load_dotenv
+import os
+import argparse
+
+# Load env vars
+load_dotenv()
+
+from src.batch_runner import BatchRunner
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless MicroSaaS validation over a JSONL file of niches.")
+    parser.add_argument("input", nargs="?", default="requests.jsonl",
+                        help='JSONL file, one {"niche": ..., "country_code": ...} per line')
+    parser.add_argument("--out", default="reports/batch_results.jsonl", help="Where to append one result line per job")
+    parser.add_argument("--workers", type=int, default=4, help="Research jobs running at once")
+    parser.add_argument("--country", default="in", help="Country code for lines that don't set one")
+    parser.add_argument("--reuse-days", type=float, default=1,
+                        help="Report jobs completed this recently from their checkpoint instead of re-running them")
+    args = parser.parse_args()
+
+    if not os.getenv("SERPAPI_KEY") or not os.getenv("GOOGLE_API_KEY"):
+        print("\n[!] CRITICAL: Keys missing in .env file.")
+        return
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    BatchRunner(args.input, output_path=args.out, workers=args.workers, default_country=args.country,
+                reuse_days=args.reuse_days).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from src.structured_output import parse_json_text
+
+SEARCH_KINDS = ("hunt", "reddit", "reviews", "metrics")
+LLM_KINDS = ("hunter", "miner", "keywords", "architect", "verifier")
+
+def search_kind(params: dict, query_type: Optional[str] = None) -> str:
+    """Which recorded pool a SerpApi query replays from: the caller's query_type
+    (the agents pass hunt/reddit/reviews/metrics), else a guess from the query."""
+    if query_type in SEARCH_KINDS:
+        return query_type
+    q = str(params.get("q", "")).lower()
+    if "site:reddit.com" in q:
+        return "reddit"
+    if "complaint" in q:
+        return "reviews"
+    if "software" in q:
+        return "hunt"  # every Hunter phrasing is "<niche> software ..."
+    return "metrics"
+
+def prompt_kind(prompt: str) -> str:
+    """Which agent sent this prompt (keyed on the stable phrases in each one)."""
+    if "### Product:" in prompt:
+        return "miner_batch"
+    if "review snippets" in prompt:
+        return "miner"
+    if "Convert each pain point" in prompt:
+        return "keywords_batch"
+    if "Convert this pain point" in prompt:
+        return "keywords"
+    if "DIRECT COMPETITORS" in prompt:
+        return "hunter"
+    if "Minimum Viable Product" in prompt:
+        return "architect"
+    return "verifier"
+
+def _pick(pool: List[Any], seed_text: str) -> Any:
+    # Deterministic per input, so the same niche/product always replays the same answer
+    digest = int(hashlib.sha1(seed_text.encode("utf-8")).hexdigest(), 16)
+    return pool[digest % len(pool)]
+
+def load_fixtures(path: str) -> Dict[str, List[Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+class RateLimited(Exception):
+    """Injected stand-in for Gemini's 429 ResourceExhausted."""
+
+class _Faults:
+    """Latency and 429 injection shared by both stand-ins (thread-safe RNG)."""
+
+    def __init__(self, latency: float, error_rate: float, seed: Optional[int]):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.injected_errors = 0
+
+    def apply(self) -> bool:
+        """Sleeps the simulated latency; returns True if this call should fail with a 429."""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * self._rng.uniform(0.5, 1.5)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+class ReplaySearch:
+    """Stand-in for GoogleSearch(params).get_dict() over recorded payloads."""
+
+    def __init__(self, fixtures: Dict[str, List[dict]], latency: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.fixtures = fixtures
+        self.faults = _Faults(latency, error_rate, seed)
+
+    def __call__(self, params: dict, query_type: str = "default") -> dict:
+        if self.faults.apply():
+            return {"error": "429: Your account has run out of searches (replay)."}
+        kind = search_kind(params, query_type)
+        # Keyed by market too: each gl gets its own results, as live searches would
+        payload = _pick(self.fixtures[kind], f"{kind}|{params.get('gl')}|{params.get('q')}|{params.get('start', 0)}")
+        return json.loads(json.dumps(payload))  # callers may mutate it
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+class _ReplayModel:
+    def __init__(self, owner: "ReplayLLM", model_name: str):
+        self.owner = owner
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None) -> _Response:
+        if self.owner.faults.apply():
+            raise RateLimited(f"429 Resource has been exhausted for {self.model_name} (replay)")
+        return _Response(self.owner.respond(prompt))
+
+class ReplayLLM:
+    """Model factory for set_model_factory(): answers each agent's prompt from
+    recorded responses, reshaped to the prompt (product names, keyword count)."""
+
+    def __init__(self, fixtures: Dict[str, List[Any]], latency: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.fixtures = fixtures
+        self.faults = _Faults(latency, error_rate, seed)
+
+    def __call__(self, model_name: str) -> _ReplayModel:
+        return _ReplayModel(self, model_name)
+
+    def respond(self, prompt: str) -> str:
+        kind = prompt_kind(prompt)
+        fx = self.fixtures
+
+        if kind == "hunter":
+            # Names are tagged per niche so each niche mines its own competitors
+            match = re.search(r"niche: '([^']*)'", prompt)
+            niche = match.group(1) if match else prompt
+            tag = hashlib.sha1(niche.encode("utf-8")).hexdigest()[:4]
+            return json.dumps([f"{name} {tag}" for name in _pick(fx["hunter"], niche)])
+        if kind == "miner_batch":
+            names = [n.strip() for n in re.findall(r"### Product: (.+)", prompt)]
+            return json.dumps({name: _pick(fx["miner"], name) for name in names})
+        if kind == "miner":
+            return json.dumps(_pick(fx["miner"], prompt))
+        if kind == "keywords_batch":
+            match = re.search(r"list of (\d+) keyword", prompt)
+            count = int(match.group(1)) if match else 1
+            pool = fx["keywords"]
+            return json.dumps([_pick(pool, f"{prompt}|{i}") for i in range(count)])
+        if kind == "keywords":
+            return _pick(fx["keywords"], prompt)
+        return json.dumps(_pick(fx[kind], prompt))
+
+class Recorder:
+    """Wraps the live backends and collects their answers in the fixture format."""
+
+    def __init__(self, search: Callable[[dict, str], dict], model_factory: Callable[[str], Any]):
+        self._search = search
+        self._model_factory = model_factory
+        self._lock = threading.Lock()
+        self.search_fixtures: Dict[str, List[Any]] = {k: [] for k in SEARCH_KINDS}
+        self.llm_fixtures: Dict[str, List[Any]] = {k: [] for k in LLM_KINDS}
+
+    def search(self, params: dict, query_type: str = "default") -> dict:
+        results = self._search(params, query_type)
+        if "error" not in results:
+            with self._lock:
+                self.search_fixtures[search_kind(params, query_type)].append(results)
+        return results
+
+    def model(self, model_name: str):
+        recorder, model = self, self._model_factory(model_name)
+
+        class _Recording:
+            def generate_content(self, prompt: str, **kwargs):
+                response = model.generate_content(prompt, **kwargs)
+                recorder._record_llm(prompt, response.text)
+                return response
+        return _Recording()
+
+    def _record_llm(self, prompt: str, text: str):
+        kind = prompt_kind(prompt)
+        if kind == "keywords":
+            value: Any = text.strip().strip('"')
+        else:
+            try:
+                value = parse_json_text(text)
+            except ValueError:
+                return
+        with self._lock:
+            if kind == "miner_batch" and isinstance(value, dict):
+                self.llm_fixtures["miner"].extend(v for v in value.values() if isinstance(v, list))
+            elif kind == "keywords_batch" and isinstance(value, list):
+                self.llm_fixtures["keywords"].extend(str(v) for v in value)
+            elif kind in self.llm_fixtures:
+                self.llm_fixtures[kind].append(value)
+
+    def save(self, search_path: str, llm_path: str):
+        for path, data in ((search_path, self.search_fixtures), (llm_path, self.llm_fixtures)):
+            # Kinds this session never hit keep their previous recordings (and
+            # their "_synthetic" label, if they were hand-built)
+            try:
+                previous = load_fixtures(path)
+            except (OSError, ValueError):
+                previous = {}
+            recorded = {k for k, v in data.items() if v}
+            data = {k: v or previous.get(k, []) for k, v in data.items()}
+            synthetic = previous.get("_synthetic") or {}
+            kinds = [k for k in synthetic.get("kinds", []) if k not in recorded]
+            if kinds:
+                data = {"_synthetic": {**synthetic, "kinds": kinds}, **data}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,216 @@
+"""Offline throughput benchmark for the research pipeline.
+
+Replays SerpApi payloads and Gemini responses from benchmarks/fixtures
+through local stand-ins, with optional injected latency and 429s, and runs
+SupervisorAgent end to end for N niches. Every run starts from empty caches
+in a scratch directory, so numbers are comparable between commits.
+
+    python -m benchmarks.run_benchmark -n 5 --llm-latency 0.8 --llm-429-rate 0.05
+    python -m benchmarks.run_benchmark --concurrency 4 --out bench.json
+    python -m benchmarks.run_benchmark --record   # refresh fixtures from the live APIs
+
+The checked-in fixtures are synthetic: hand-built in the live APIs' response
+shapes, not recordings. Each file lists its synthetic pools under "_synthetic"
+until --record replaces them.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from typing import Dict, List
+
+from src.supervisor import SupervisorAgent
+from src.state import ResearchStage
+from src.model_registry import get_registry
+from src.rate_limit import configure_limiter
+from src.search_cache import set_search_backend, _google_search
+from src.llm_client import get_llm_client, set_model_factory, _gemini_model
+from .replay import ReplaySearch, ReplayLLM, Recorder, load_fixtures, SEARCH_KINDS, LLM_KINDS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPLAY_MODELS = ["models/gemini-1.5-flash-latest", "models/gemini-1.5-pro-latest"]
+DEFAULT_NICHES = [
+    "appointment scheduling for dental clinics",
+    "inventory tracking for small warehouses",
+    "job scheduling for HVAC contractors",
+    "invoice management for freelance designers",
+    "attendance tracking for coaching institutes",
+    "menu costing for cloud kitchens",
+    "client onboarding for CA firms",
+    "maintenance logs for gym owners",
+]
+
+# What each stage's throughput is measured in
+STAGE_ITEMS = {
+    "stage.hunting": ("niches", lambda s: 1),
+    "stage.mining": ("competitors", lambda s: len(s.competitors)),
+    "stage.validating": ("pains", lambda s: len(s.pain_points)),
+    "stage.architecting": ("specs", lambda s: 1 if s.product_spec else 0),
+}
+
+def _run_one(niche: str, country: str) -> SupervisorAgent:
+    supervisor = SupervisorAgent(niche, country_code=country)
+    supervisor.run()
+    if supervisor.state.current_stage == ResearchStage.HUNTING_REVIEW:
+        supervisor.state.current_stage = ResearchStage.MINING  # auto-approve
+        supervisor.run()
+    return supervisor
+
+async def _run_concurrent(niches: List[str], country: str, concurrency: int) -> List[SupervisorAgent]:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(niche: str) -> SupervisorAgent:
+        async with sem:
+            supervisor = SupervisorAgent(niche, country_code=country)
+            await supervisor.arun()
+            if supervisor.state.current_stage == ResearchStage.HUNTING_REVIEW:
+                supervisor.state.current_stage = ResearchStage.MINING
+                await supervisor.arun()
+            return supervisor
+
+    return await asyncio.gather(*(one(n) for n in niches))
+
+def summarize(supervisors: List[SupervisorAgent], wall_seconds: float) -> Dict:
+    stages: Dict[str, Dict] = {}
+    calls: Dict[str, Dict] = {}
+    per_niche = []
+    for sup in supervisors:
+        state = sup.state
+        for span in state.spans:
+            if span.kind == "stage" and span.name in STAGE_ITEMS:
+                unit, count = STAGE_ITEMS[span.name]
+                row = stages.setdefault(span.name, {"unit": unit, "items": 0, "seconds": 0.0})
+                row["items"] += count(state)
+                row["seconds"] += span.duration_ms / 1000
+        for kind, row in sup.tracer.summary().items():
+            if kind == "stage":
+                continue
+            total = calls.setdefault(kind, {})
+            for k, v in row.items():
+                total[k] = round(total.get(k, 0) + v, 1)
+        retries = sum(s.attributes.get("retries", 0) for s in state.spans)
+        per_niche.append({
+            "niche": state.niche,
+            "completed": state.current_stage == ResearchStage.COMPLETED,
+            "stage_seconds": round(sum(s.duration_ms for s in state.spans if s.kind == "stage") / 1000, 3),
+            "competitors": len(state.competitors),
+            "pains": len(state.pain_points),
+            "ideas": len(state.final_ideas),
+            "llm_retries": retries,
+        })
+
+    for row in stages.values():
+        row["seconds"] = round(row["seconds"], 3)
+        row["per_second"] = round(row["items"] / row["seconds"], 3) if row["seconds"] else None
+
+    return {
+        "niches": len(supervisors),
+        "wall_seconds": round(wall_seconds, 3),
+        "niches_per_minute": round(60 * len(supervisors) / wall_seconds, 2) if wall_seconds else None,
+        "stages": stages,
+        "calls": calls,
+        "llm_client": get_llm_client().stats(),
+        "per_niche": per_niche,
+    }
+
+def _print_summary(result: Dict, config: Dict):
+    print("\n=== Benchmark ===")
+    print(f"config: {json.dumps(config)}")
+    print(f"{result['niches']} niches in {result['wall_seconds']}s ({result['niches_per_minute']} niches/min)")
+    for name, row in result["stages"].items():
+        print(f"  {name:<20} {row['items']:>4} {row['unit']:<12} {row['seconds']:>8.2f}s  {row['per_second']} /s")
+    for kind, row in result["calls"].items():
+        print(f"  [{kind}] {row}")
+    failed = [r["niche"] for r in result["per_niche"] if not r["completed"]]
+    if failed:
+        print(f"  [!] Did not complete: {failed}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline SupervisorAgent throughput benchmark.")
+    parser.add_argument("-n", "--niches", type=int, default=3, help="How many of the built-in niches to run")
+    parser.add_argument("--niche", action="append", help="Run this niche (repeatable; overrides -n)")
+    parser.add_argument("--country", default="in")
+    parser.add_argument("--concurrency", type=int, default=1, help=">1 runs niches concurrently via arun()")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Mean seconds per SerpApi call")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Mean seconds per Gemini call")
+    parser.add_argument("--search-429-rate", type=float, default=0.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="Lift the client-side rate limits and shrink backoff (measures pipeline overhead only)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--record", action="store_true", help="Call the live APIs and rewrite the fixtures")
+    parser.add_argument("--out", help="Write the JSON result here (for CI comparisons)")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' own output")
+    args = parser.parse_args(argv)
+
+    niches = args.niche or DEFAULT_NICHES[:args.niches]
+    fixtures_dir = os.path.abspath(args.fixtures)
+    search_path = os.path.join(fixtures_dir, "serpapi.json")
+    llm_path = os.path.join(fixtures_dir, "gemini.json")
+    out_path = os.path.abspath(args.out) if args.out else None
+
+    recorder = None
+    synthetic = []
+    if args.record:
+        recorder = Recorder(_google_search, _gemini_model)
+        set_search_backend(recorder.search)
+        set_model_factory(recorder.model)
+    else:
+        search_fixtures, llm_fixtures = load_fixtures(search_path), load_fixtures(llm_path)
+        missing = [k for k in SEARCH_KINDS if not search_fixtures.get(k)] + \
+                  [k for k in LLM_KINDS if not llm_fixtures.get(k)]
+        if missing:
+            print(f"[!] Fixtures have no recordings for: {missing}")
+            return 2
+        synthetic = [f"serpapi:{k}" for k in (search_fixtures.get("_synthetic") or {}).get("kinds", [])] + \
+                    [f"gemini:{k}" for k in (llm_fixtures.get("_synthetic") or {}).get("kinds", [])]
+        if synthetic:
+            print(f"[i] Replaying synthetic (hand-built) fixtures for: {synthetic}")
+        set_search_backend(ReplaySearch(search_fixtures, args.search_latency, args.search_429_rate, args.seed))
+        set_model_factory(ReplayLLM(llm_fixtures, args.llm_latency, args.llm_429_rate, args.seed))
+        get_registry().seed(REPLAY_MODELS)
+
+    if args.unthrottled:
+        configure_limiter("serpapi", 1e6, 1e6)
+        for model in get_registry().models():
+            configure_limiter(f"gemini:{model}", 1e6, 1e6)
+        get_llm_client().base_delay = 0.01
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "verbose", "fixtures")}
+    config["synthetic_fixtures"] = synthetic
+    cwd = os.getcwd()
+    # Scratch dir: cold caches, checkpoints, knowledge store and reports per run
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, \
+                    (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+                if args.concurrency > 1:
+                    supervisors = asyncio.run(_run_concurrent(niches, args.country, args.concurrency))
+                else:
+                    supervisors = [_run_one(n, args.country) for n in niches]
+            result = summarize(supervisors, time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+    result["config"] = config
+    _print_summary(result, config)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Result written to {out_path}")
+    if recorder:
+        recorder.save(search_path, llm_path)
+        print(f"Fixtures recorded to {fixtures_dir}")
+
+    return 0 if all(r["completed"] for r in result["per_niche"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ load_dotenv()
 from src.supervisor import SupervisorAgent
 from src.state import ResearchStage
 from src.agents.verifier import VerifierAgent # <--- NEW IMPORT
+from src.multi_market import MultiMarketResearch
 
 def main():
     # 1. API Check
@@ -23,7 +24,8 @@ def main():
     
     # 2. Raw Input
     raw_niche = input("\n>> Enter Niche Idea: ")
-    country_input = input(">> Enter Country Code (default 'in'): ") or "in"
+    country_input = input(">> Enter Country Code(s), comma-separated to compare (default 'in'): ") or "in"
+    country_codes = [c.strip().lower() for c in country_input.split(",") if c.strip()] or ["in"]
 
     # 3. INTENT VERIFICATION LOOP (The New Quality Gate)
     verifier = VerifierAgent()
@@ -58,9 +60,18 @@ def main():
         else:
             print("   -> Invalid choice. Trying again...")
 
+    # 4a. Several markets: one shared run, competitors auto-approved
+    if len(country_codes) > 1:
+        print(f"\n🚀 Comparing {', '.join(c.upper() for c in country_codes)} for: '{final_niche}'...")
+        comparison = MultiMarketResearch(final_niche, country_codes).run()
+        for m in comparison["markets"]:
+            print(f"   {m['country_code'].upper()}: top score {m['top_score']} ({m['top_keyword']}), "
+                  f"{len(m['competitors'])} competitors")
+        return
+
     # 4. Launch Supervisor with the OPTIMIZED Niche
     print(f"\n🚀 Launching Supervisor for: '{final_niche}'...")
-    supervisor = SupervisorAgent(niche=final_niche, country_code=country_input)
+    supervisor = SupervisorAgent(niche=final_niche, country_code=country_codes[0])
     
     # 5. Run Workflow
     state = supervisor.run()
@@ -1,22 +1,12 @@
-import os
-import time
-import json
-import google.generativeai as genai
+import asyncio
 from ..state import ValidatedIdea, PainPoint, ProductSpec
+from ..llm_client import get_llm_client
 
 class ArchitectAgent:
     def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.available_models = []
-        
-        # --- DYNAMIC DISCOVERY ---
-        try:
-            all_models = list(genai.list_models())
-            valid_models = [m.name for m in all_models if 'generateContent' in m.supported_generation_methods]
-            # Prefer Pro for complex reasoning, Flash for speed
-            self.available_models = sorted(valid_models, key=lambda x: 0 if 'pro' in x else (1 if 'flash' in x else 2))
-        except:
-            self.available_models = ['models/gemini-1.5-flash-latest']
+        self.llm = get_llm_client()
+        # Prefer Pro for complex reasoning, Flash for speed
+        self.model_preference = "pro"
 
     def create_spec(self, idea: ValidatedIdea, pains: list[PainPoint]) -> ProductSpec:
         print(f"   [Architect] Designing MVP for: '{idea.target_keyword}'...")
@@ -45,28 +35,18 @@ class ArchitectAgent:
         }}
         """
 
-        # --- RETRY LOOP ---
-        for model_name in self.available_models:
+        data = self.llm.generate_json(prompt, prefer=self.model_preference, schema=ProductSpec)
+        if isinstance(data, dict):
             try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                cleaned = response.text.replace("```json", "").replace("```", "").strip()
-                data = json.loads(cleaned)
                 return ProductSpec(**data)
             except Exception as e:
-                if "429" in str(e):
-                    time.sleep(5)
-                    try:
-                        response = model.generate_content(prompt)
-                        cleaned = response.text.replace("```json", "").replace("```", "").strip()
-                        data = json.loads(cleaned)
-                        return ProductSpec(**data)
-                    except:
-                        pass
-                continue
+                print(f"   [!] Architect returned an incomplete spec: {e}")
         
         # Fallback empty spec if AI fails completely
         return ProductSpec(
             mvp_name="Error Generating Spec", tagline="", core_features=[], 
             tech_stack_recommendation=[], user_stories=[], marketing_hook=""
-        )
\ No newline at end of file
+        )
+
+    async def acreate_spec(self, idea: ValidatedIdea, pains: list[PainPoint]) -> ProductSpec:
+        return await asyncio.to_thread(self.create_spec, idea, pains)
@@ -1,76 +1,172 @@
 import os
-import time
-import json
-import google.generativeai as genai
-from serpapi import GoogleSearch
-from typing import List
+import asyncio
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 from ..state import Competitor
+from ..llm_client import get_llm_client
+from ..search_cache import cached_search
+from ..knowledge_store import get_knowledge_store
+from ..instrumentation import context_map
+from ..entity_resolution import get_entity_resolver
+from ..prompt_builder import PromptBuilder, budget_for
+from ..structured_output import STRING_LIST
+
+# Phrasings surface different slices of the market: list posts, "X alternatives"
+# pages, head-to-head comparisons, pricing roundups and review sites
+QUERY_TEMPLATES = [
+    "best {niche} software tools list",
+    "{niche} software alternatives",
+    "{niche} software vs",
+    "{niche} software pricing",
+    "{niche} software reviews",
+]
+RESULTS_PER_PAGE = 10
+MAX_RESULTS = 40  # snippets sent to the extraction prompt
 
 class HunterAgent:
-    def __init__(self, api_key: str = None, country_code: str = "us"):
+    def __init__(self, api_key: str = None, country_code: str = "us", use_knowledge_store: bool = True,
+                 fan_out: bool = True, pages: int = 2, query_templates: Optional[List[str]] = None,
+                 max_workers: int = 6):
         self.serp_api_key = api_key or os.getenv("SERPAPI_KEY")
         self.country_code = country_code
+        self.store = get_knowledge_store() if use_knowledge_store else None
+
+        # Fan-out runs every phrasing x page in parallel (len(templates) * pages
+        # SerpApi calls, cached for a week); off = the original single query
+        self.fan_out = fan_out
+        self.pages = max(1, pages)
+        self.query_templates = query_templates or QUERY_TEMPLATES
+        self.max_workers = max_workers
+        self.resolver = get_entity_resolver()
         
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.available_models = []
-        
-        # --- DYNAMIC MODEL DISCOVERY (Same as Verifier) ---
-        try:
-            all_models = list(genai.list_models())
-            valid_models = [
-                m.name for m in all_models 
-                if 'generateContent' in m.supported_generation_methods
-            ]
-            # Sort: Flash first, then Pro
-            self.available_models = sorted(
-                valid_models, 
-                key=lambda x: 0 if 'flash' in x else (1 if 'pro' in x else 2)
-            )
-            print(f"   [Hunter] System: Discovered {len(self.available_models)} usable AI models.")
-        except Exception as e:
-            print(f"   [Hunter] Warning: Model discovery failed ({e}). using fallback.")
-            self.available_models = ['models/gemini-1.5-flash-latest']
+        # Shared Gemini client (Flash first, then Pro)
+        self.llm = get_llm_client()
+        self.model_preference = "flash"
 
     def hunt(self, niche: str) -> List[Competitor]:
+        # 0. A fresh run of the same niche already did this work
+        if self.store:
+            known = self.store.recent_competitors(niche, self.country_code)
+            if known:
+                print(f"   [Hunter] Reusing {len(known)} competitors from the knowledge store.")
+                # The full scan, all candidates selected (as a fresh hunt returns them);
+                # an earlier analyst's deselections don't carry over
+                return [c.model_copy(update={"is_relevant": True}) for c in known]
+
         print(f"   [Hunter] Scouring Google for '{niche}' in ({self.country_code.upper()})...")
         
         # 1. Google Search
-        params = {
-            "engine": "google",
-            "q": f"best {niche} software tools list", 
-            "api_key": self.serp_api_key,
-            "gl": self.country_code,
-            "num": 8
-        }
-        
-        try:
-            search = GoogleSearch(params)
-            results = search.get_dict().get("organic_results", [])
-        except Exception as e:
-            print(f"   [!] Google Search Failed: {e}")
+        results = self._search_all(niche)
+        if results is None:
             return []
         
-        # 2. Prepare Data
-        raw_text = ""
-        for r in results:
-            raw_text += f"Title: {r.get('title')}\nSnippet: {r.get('snippet')}\n---\n"
+        # 2. Prepare Data (earlier = better-ranked, so it wins the budget)
+        builder = PromptBuilder(budget_for(self.model_preference), separator="\n---\n")
+        for rank, r in enumerate(results):
+            builder.add(f"Title: {r.get('title')}\nSnippet: {r.get('snippet')}", priority=-rank)
+        raw_text = builder.build("hunter")
+        stats = builder.stats
+        if stats["tokens_saved"]:
+            print(f"   [Hunter] Prompt packed to ~{stats['tokens_out']} tokens "
+                  f"(saved ~{stats['tokens_saved']}, {stats['duplicates']} near-duplicates dropped).")
 
         # 3. AI Extraction with RETRY LOOP
         print("   [Hunter] Using AI to extract actual product names...")
         extracted_names = self._extract_names_with_retry(niche, raw_text)
         
-        # 4. Build Objects
-        competitors = []
+        # 4. Build Objects (one per real product, however the AI spelled it)
+        competitors, seen = [], set()
         for name in extracted_names:
+            url = f"https://google.com/search?q={name}"
+            canonical = self.resolver.resolve(name, url)
+            if canonical in seen:
+                continue
+            seen.add(canonical)
             competitors.append(Competitor(
                 name=name,
-                url=f"https://google.com/search?q={name}",
-                is_relevant=True
+                url=url,
+                is_relevant=True,
+                canonical_id=canonical,
             ))
             
-        print(f"   [Hunter] Identified {len(competitors)} candidates: {', '.join(extracted_names)}")
+        print(f"   [Hunter] Identified {len(competitors)} candidates: {', '.join(c.name for c in competitors)}")
         return competitors
 
+    async def ahunt(self, niche: str) -> List[Competitor]:
+        return await asyncio.to_thread(self.hunt, niche)
+
+    def _queries(self, niche: str) -> List[Tuple[str, int]]:
+        if not self.fan_out:
+            return [(QUERY_TEMPLATES[0].format(niche=niche), 0)]
+        return [(template.format(niche=niche), page)
+                for template in self.query_templates for page in range(self.pages)]
+
+    def _search_all(self, niche: str) -> Optional[List[dict]]:
+        """Runs every query in parallel and merges their organic results.
+        Returns None only if every query failed."""
+        queries = self._queries(niche)
+        if len(queries) > 1:
+            print(f"   [Hunter] Fanning out over {len(queries)} queries...")
+
+        workers = min(self.max_workers, len(queries))
+        if workers <= 1:
+            pages = [self._search_one(q, page) for q, page in queries]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pages = context_map(pool, lambda qp: self._search_one(*qp), queries)
+
+        if all(p is None for p in pages):
+            return None
+        merged = self._merge_results([p for p in pages if p])
+        if len(queries) > 1:
+            total = sum(len(p) for p in pages if p)
+            print(f"   [Hunter] {total} results -> {len(merged)} unique.")
+        return merged
+
+    def _search_one(self, query: str, page: int) -> Optional[List[dict]]:
+        params = {
+            "engine": "google",
+            "q": query,
+            "api_key": self.serp_api_key,
+            "gl": self.country_code,
+        }
+        if self.fan_out:
+            params["num"] = RESULTS_PER_PAGE
+            if page:
+                params["start"] = page * RESULTS_PER_PAGE
+        else:
+            params["num"] = 8
+
+        try:
+            results = cached_search(params, query_type="hunt")
+        except Exception as e:
+            print(f"   [!] Google Search Failed ({query}): {e}")
+            return None
+        if "error" in results:
+            print(f"   [!] Google Search Failed ({query}): {results['error']}")
+            return None
+        return results.get("organic_results", [])
+
+    @staticmethod
+    def _merge_results(pages: List[List[dict]]) -> List[dict]:
+        """Round-robin across queries (each one's top hits first), dropping
+        repeats of the same page or title."""
+        merged, seen = [], set()
+        for rank in range(max((len(p) for p in pages), default=0)):
+            for page in pages:
+                if rank >= len(page):
+                    continue
+                result = page[rank]
+                parts = urlsplit(result.get("link") or "")
+                url_key = (parts.netloc.lower().removeprefix("www.") + parts.path.rstrip("/")) or None
+                title_key = " ".join(str(result.get("title", "")).lower().split()) or None
+                if (url_key and url_key in seen) or (title_key and title_key in seen):
+                    continue
+                seen.update(k for k in (url_key, title_key) if k)
+                merged.append(result)
+        return merged[:MAX_RESULTS]
+
     def _extract_names_with_retry(self, niche: str, text: str) -> List[str]:
         prompt = f"""
         I am researching competitors in the niche: '{niche}'.
@@ -90,30 +186,9 @@ class HunterAgent:
         Return ONLY a raw JSON list of strings. Example: ["Tool A", "Tool B"]
         """
         
-        # Cycle through models
-        for model_name in self.available_models:
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                
-                cleaned_json = response.text.replace("```json", "").replace("```", "").strip()
-                return json.loads(cleaned_json)
-                
-            except Exception as e:
-                # Handle Rate Limit (429)
-                if "429" in str(e) or "quota" in str(e).lower():
-                    print(f"     [!] Rate limit on {model_name}. Waiting 5s...")
-                    time.sleep(5)
-                    try:
-                        # Retry once
-                        response = model.generate_content(prompt)
-                        cleaned_json = response.text.replace("```json", "").replace("```", "").strip()
-                        return json.loads(cleaned_json)
-                    except:
-                        pass # Move to next model
-                else:
-                    # If 404 or other error, skip immediately
-                    continue
+        names = self.llm.generate_json(prompt, prefer=self.model_preference, schema=STRING_LIST)
+        if isinstance(names, list):
+            return names
 
         print("   [!] Hunter AI failed (All models exhausted). Returning empty list.")
         return []
\ No newline at end of file
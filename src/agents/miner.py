@@ -1,54 +1,370 @@
 import os
-import time
-import json
-import requests
-import google.generativeai as genai
-from serpapi import GoogleSearch
-from typing import List
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from ..state import Competitor, PainPoint
+from ..llm_client import get_llm_client, MALFORMED
+from ..search_cache import cached_search
+from ..knowledge_store import get_knowledge_store
+from ..instrumentation import context_map
+from ..entity_resolution import get_entity_resolver
+from ..prompt_builder import PromptBuilder, estimate_tokens
+from ..structured_output import array_of, object_of
+
+# Per-competitor snippet budget (the original prompt sliced text to 5000 chars)
+MAX_TEXT_TOKENS = 1250
+
+# What the model fills in; `competitors` is set by the miner itself
+PAINS_SCHEMA = array_of(PainPoint, exclude={"competitors"})
+
+class _Progress:
+    """Thread-safe step counter feeding an optional on_progress(fraction, message) callback."""
+
+    def __init__(self, total_steps: int, callback: Optional[Callable[[float, str], None]]):
+        self.total = max(1, total_steps)
+        self.done = 0
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def step(self, message: str, steps: int = 1):
+        if not self.callback or steps <= 0:
+            return
+        with self._lock:
+            self.done = min(self.total, self.done + steps)
+            fraction = self.done / self.total
+        self.callback(fraction, message)
+
+class _BatchPacker:
+    """Incremental greedy packing of (name, text) pairs under a token budget."""
+
+    def __init__(self, token_budget: int, max_batch_size: int):
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.current: List[Tuple[str, str]] = []
+        self.used = 0
+
+    def add(self, name: str, text: str) -> Optional[List[Tuple[str, str]]]:
+        """Adds an item; returns the previous batch if this item didn't fit in it."""
+        cost = estimate_tokens(name) + estimate_tokens(text)
+        full = None
+        if self.current and (self.used + cost > self.token_budget or len(self.current) >= self.max_batch_size):
+            full = self.flush()
+        self.current.append((name, text))
+        self.used += cost
+        return full
+
+    def flush(self) -> List[Tuple[str, str]]:
+        batch, self.current, self.used = self.current, [], 0
+        return batch
+
+class _AnalysisMemo:
+    """Pains per (product, snippet text), shared by every MinerAgent in the
+    process: markets whose searches return the same snippets analyze them once."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[PainPoint]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(product_id: str, text: str) -> str:
+        return hashlib.sha256(f"{product_id}\n{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[PainPoint]]:
+        with self._lock:
+            pains = self._entries.get(key)
+            if pains is None:
+                return None
+            self._entries.move_to_end(key)
+            return [p.model_copy() for p in pains]
+
+    def put(self, key: str, pains: List[PainPoint]):
+        if not pains:
+            return  # an empty answer may be a failed call; let the next market retry
+        with self._lock:
+            self._entries[key] = [p.model_copy() for p in pains]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_analysis_memo = _AnalysisMemo()
 
 class MinerAgent:
-    def __init__(self, country_code: str = "us"):
+    def __init__(self, country_code: str = "us", max_workers: int = 4,
+                 batch_analysis: bool = True, batch_token_budget: int = 6000, max_batch_size: int = 6,
+                 memo_size: int = 512, use_knowledge_store: bool = True,
+                 text_token_budget: int = MAX_TEXT_TOKENS):
         self.serp_api_key = os.getenv("SERPAPI_KEY")
         self.country_code = country_code
+        self.max_workers = max_workers  # 1 = the old serial walk
+
+        # Batched mode packs several competitors into one Gemini prompt
+        self.batch_analysis = batch_analysis
+        self.batch_token_budget = batch_token_budget
+        self.max_batch_size = max_batch_size
+        self.text_token_budget = text_token_budget
+
+        # Shared Gemini client: per-model rate limiting replaces the old polite delay
+        self.llm = get_llm_client()
+        self.model_preference = "flash"
+
+        # Spelling variants of one product ("Acme", "acme.io") share a canonical id
+        self.resolver = get_entity_resolver()
+
+        # Results per (canonical competitor id, country), reused across mine() calls
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[Tuple[str, str], List[PainPoint]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+        # Cross-run results; competitors mined recently elsewhere are skipped
+        self.store = get_knowledge_store() if use_knowledge_store else None
+
+    def mine(self, competitors: List[Competitor],
+             on_progress: Optional[Callable[[float, str], None]] = None) -> List[PainPoint]:
+        """on_progress(fraction, message) is called as each competitor is fetched and analyzed."""
+        relevant = self._unique_relevant(competitors)
+        pending = self._pending(relevant)
+        print(f"   [Miner] Deep Dive on {len(pending)} new of {len(relevant)} competitors ({self.max_workers} workers)...")
+        progress = _Progress(2 * len(pending), on_progress)
+
+        def collect(comp: Competitor) -> str:
+            text = self._collect_text(comp)
+            progress.step(f"Fetched reviews for {comp.name}")
+            return text
+
+        if not self.batch_analysis:
+            def mine_one(comp: Competitor) -> List[PainPoint]:
+                pains = self._analyze_text(comp.name, collect(comp))
+                progress.step(f"Analyzed {comp.name}")
+                return pains
+            results = self._map(mine_one, pending)
+            return self._remember_and_collect(relevant, pending, dict(zip((c.name for c in pending), results)))
+
+        # Batched: fetch all texts concurrently, then one LLM call per batch
+        texts = self._map(collect, pending)
+        items = [(comp.name, text) for comp, text in zip(pending, texts) if text]
+        progress.step("No reviews found for some competitors", steps=len(pending) - len(items))
+        batches = self._pack_batches(items)
+        print(f"   [Miner] Analyzing {len(items)} competitors in {len(batches)} batched prompt(s)...")
+
+        def analyze(batch: List[Tuple[str, str]]) -> Dict[str, List[PainPoint]]:
+            result = self._analyze_batch(batch)
+            progress.step(f"Analyzed {', '.join(name for name, _ in batch)}", steps=len(batch))
+            return result
+
+        pains_by_name: Dict[str, List[PainPoint]] = {}
+        for batch_result in self._map(analyze, batches):
+            pains_by_name.update(batch_result)
+
+        return self._remember_and_collect(relevant, pending, pains_by_name)
+
+    async def amine(self, competitors: List[Competitor]) -> List[PainPoint]:
+        """Async mine. Searches run concurrently, and each batch goes to the LLM
+        as soon as its texts are in, while later searches are still running."""
+        relevant = self._unique_relevant(competitors)
+        pending = self._pending(relevant)
+        print(f"   [Miner] Async deep dive on {len(pending)} new of {len(relevant)} competitors...")
+        slots = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def bounded(fn, *args):
+            async with slots:
+                return await asyncio.to_thread(fn, *args)
+
+        if not self.batch_analysis:
+            results = await asyncio.gather(*(bounded(self._mine_competitor, comp) for comp in pending))
+            return self._remember_and_collect(relevant, pending, dict(zip((c.name for c in pending), results)))
+
+        text_tasks = [asyncio.create_task(bounded(self._collect_text, comp)) for comp in pending]
+        packer = _BatchPacker(self.batch_token_budget, self.max_batch_size)
+        analysis_tasks = []
+        for comp, task in zip(pending, text_tasks):
+            text = await task
+            if not text:
+                continue
+            full = packer.add(comp.name, text)
+            if full:
+                analysis_tasks.append(asyncio.create_task(bounded(self._analyze_batch, full)))
+        if packer.current:
+            analysis_tasks.append(asyncio.create_task(bounded(self._analyze_batch, packer.flush())))
+
+        pains_by_name: Dict[str, List[PainPoint]] = {}
+        for batch_result in await asyncio.gather(*analysis_tasks):
+            pains_by_name.update(batch_result)
+
+        return self._remember_and_collect(relevant, pending, pains_by_name)
+
+    # --- Per-competitor memo: changing the selection only mines the delta ---
+
+    def _canonical_id(self, comp: Competitor) -> str:
+        return comp.canonical_id or self.resolver.resolve(comp.name, comp.url)
+
+    def _unique_relevant(self, competitors: List[Competitor]) -> List[Competitor]:
+        """Relevant competitors, each real product once (first spelling wins)."""
+        unique, seen = [], set()
+        for comp in competitors:
+            if not comp.is_relevant:
+                continue
+            canonical = self._canonical_id(comp)
+            if canonical in seen:
+                print(f"     -> {comp.name}: Same product as an earlier competitor. Skipping.")
+                continue
+            seen.add(canonical)
+            unique.append(comp)
+        return unique
+
+    def _memo_key(self, comp: Competitor) -> Tuple[str, str]:
+        return (self._canonical_id(comp), self.country_code.lower())
+
+    def _pending(self, competitors: List[Competitor]) -> List[Competitor]:
+        """Competitors with no result in the memo or (fresh) in the knowledge store."""
+        with self._memo_lock:
+            missing = [comp for comp in competitors if self._memo_key(comp) not in self._memo]
+
+        pending = []
+        for comp in missing:
+            stored = (self.store.recent_pains_for(comp.name, self.country_code, key=self._canonical_id(comp))
+                      if self.store else None)
+            if stored is None:
+                pending.append(comp)
+                continue
+            print(f"     -> {comp.name}: Reusing {len(stored)} insights from the knowledge store.")
+            with self._memo_lock:
+                self._memo[self._memo_key(comp)] = stored
+        return pending
+
+    def _remember_and_collect(self, relevant: List[Competitor], pending: List[Competitor],
+                              pains_by_name: Dict[str, List[PainPoint]]) -> List[PainPoint]:
+        """Stores fresh results, then returns every competitor's pains in input order."""
+        with self._memo_lock:
+            for comp in pending:
+                pains = pains_by_name.get(comp.name)
+                if not pains:
+                    continue  # may be a failed fetch or call; retry on the next mine()
+                self._memo[self._memo_key(comp)] = [
+                    p.model_copy(update={"competitors": [comp.name]}) for p in pains
+                ]
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+            all_pains = []
+            for comp in relevant:
+                key = self._memo_key(comp)
+                pains = self._memo.get(key)
+                if pains is None:  # not memoized (no pains) or evicted mid-call
+                    pains = pains_by_name.get(comp.name, [])
+                else:
+                    self._memo.move_to_end(key)
+                # Copies (under this run's spelling), so later stages can't mutate the memo
+                all_pains.extend(p.model_copy(update={"competitors": [comp.name]}) for p in pains)
+            return all_pains
+
+    def _map(self, fn, items: list) -> list:
+        """Order-preserving map over the worker pool (serial when max_workers <= 1)."""
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        # pool.map keeps input order, so output is deterministic; context_map
+        # also carries the active tracer into the workers
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return context_map(pool, fn, items)
+
+    def _mine_competitor(self, comp: Competitor) -> List[PainPoint]:
+        return self._analyze_text(comp.name, self._collect_text(comp))
+
+    def _analyze_text(self, name: str, text_data: str) -> List[PainPoint]:
+        if not text_data:
+            return []
+
+        key = _analysis_memo.key(self.resolver.resolve(name), text_data)
+        pains = _analysis_memo.get(key)
+        if pains is None:
+            pains = self._analyze_with_retry(name, text_data)
+            _analysis_memo.put(key, pains)
+        print(f"     -> {name}: Found {len(pains)} insights.")
+        return pains
+
+    def _collect_text(self, comp: Competitor) -> str:
+        print(f"   [Miner] Analyzing: {comp.name}...")
+
+        # 1. Reddit Strategy
+        text_data = self._get_reddit_data(comp.name)
+
+        # 2. Fallback to General Reviews
+        if not text_data:
+            print(f"     -> No Reddit data for {comp.name}. Checking general reviews...")
+            text_data = self._get_general_reviews(comp.name)
+
+        return text_data
+
+    def _pack_batches(self, items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """Greedily pack (name, text) pairs into batches within the token budget."""
+        packer = _BatchPacker(self.batch_token_budget, self.max_batch_size)
+        batches = [full for name, text in items for full in [packer.add(name, text)] if full]
+        if packer.current:
+            batches.append(packer.flush())
+        return batches
+
+    def _analyze_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, List[PainPoint]]:
+        """Serves snippets already analyzed (e.g. by another market) from the
+        shared memo and sends only the rest to the LLM."""
+        results, todo, keys = {}, [], {}
+        for name, text in batch:
+            keys[name] = _analysis_memo.key(self.resolver.resolve(name), text)
+            cached = _analysis_memo.get(keys[name])
+            if cached is None:
+                todo.append((name, text))
+            else:
+                results[name] = cached
+                print(f"     -> {name}: Reusing {len(cached)} insights from identical snippets.")
+        if todo:
+            fresh = self._analyze_uncached_batch(todo)
+            for name, pains in fresh.items():
+                _analysis_memo.put(keys[name], pains)
+            results.update(fresh)
+        return results
+
+    def _analyze_uncached_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, List[PainPoint]]:
+        if len(batch) == 1:
+            name, text = batch[0]
+            return {name: self._analyze_with_retry(name, text)}
+
+        sections = "\n".join(f"### Product: {name}\n{text}" for name, text in batch)
+        prompt = f"""
+        Analyze the review snippets below. They cover {len(batch)} different products, each under a "### Product:" header.
+        For EACH product, extract 1-2 distinct pain points (Pricing, UX, or Missing Features).
+        If a product's text is positive or marketing fluff, give it an empty list.
         
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.available_models = []
+        Return ONLY a valid JSON object keyed by the exact product name. Format:
+        {{"Product Name": [{{"source": "Google Snippet", "quote": "...", "pain_category": "Pricing", "sentiment_score": -0.5, "frequency": 1}}]}}
         
-        # --- DYNAMIC DISCOVERY ---
-        try:
-            all_models = list(genai.list_models())
-            valid_models = [m.name for m in all_models if 'generateContent' in m.supported_generation_methods]
-            self.available_models = sorted(valid_models, key=lambda x: 0 if 'flash' in x else (1 if 'pro' in x else 2))
-            print(f"   [Miner] System: Discovered {len(self.available_models)} usable AI models.")
-        except:
-            self.available_models = ['models/gemini-1.5-flash-latest']
+        Data:
+        {sections}
+        """
 
-    def mine(self, competitors: List[Competitor]) -> List[PainPoint]:
-        all_pains = []
-        print(f"   [Miner] Deep Dive on {len(competitors)} competitors...")
+        schema = object_of({name: PAINS_SCHEMA for name, _ in batch})
+        data = self.llm.generate_json(prompt, prefer=self.model_preference, schema=schema)
+        if data is MALFORMED:
+            # Re-asking per competitor would pay for the same answer again; these
+            # aren't memoized, so the next mine() retries them
+            print(f"     [!] Batched analysis reply was unusable. Skipping {len(batch)} competitors for now.")
+            return {name: [] for name, _ in batch}
+        if not isinstance(data, dict):
+            # Every model failed: fall back to one call per competitor
+            print(f"     [!] Batched analysis failed. Falling back to {len(batch)} single calls.")
+            results = {}
+            for name, text in batch:
+                results[name] = self._analyze_with_retry(name, text)
+            return results
 
-        for comp in competitors:
-            if not comp.is_relevant: continue
-            
-            print(f"   [Miner] Analyzing: {comp.name}...")
-            
-            # 1. Reddit Strategy
-            text_data = self._get_reddit_data(comp.name)
-            
-            # 2. Fallback to General Reviews
-            if not text_data:
-                print(f"     -> No Reddit data. Checking general reviews...")
-                text_data = self._get_general_reviews(comp.name)
-
-            if text_data:
-                pains = self._analyze_with_retry(comp.name, text_data)
-                all_pains.extend(pains)
-                print(f"     -> Found {len(pains)} insights.")
-            
-            time.sleep(1) # Polite delay
-            
-        return all_pains
+        # Map answers back; tolerate the model changing the key's case
+        by_lower = {str(k).strip().lower(): v for k, v in data.items()}
+        results = {}
+        for name, _ in batch:
+            pains = self._to_pains(data.get(name, by_lower.get(name.lower(), [])))
+            results[name] = pains
+            print(f"     -> {name}: Found {len(pains)} insights.")
+        return results
 
     def _analyze_with_retry(self, name: str, text: str) -> List[PainPoint]:
         prompt = f"""
@@ -60,29 +376,22 @@ class MinerAgent:
         [{{"source": "Google Snippet", "quote": "...", "pain_category": "Pricing", "sentiment_score": -0.5, "frequency": 1}}]
         
         Data:
-        {text[:5000]}
+        {text}
         """
         
-        # --- RETRY LOOP ---
-        for model_name in self.available_models:
+        data = self.llm.generate_json(prompt, prefer=self.model_preference, schema=PAINS_SCHEMA)
+        return self._to_pains(data)
+
+    @staticmethod
+    def _to_pains(raw) -> List[PainPoint]:
+        """Valid items only: one malformed (or truncated) item doesn't sink the rest."""
+        pains = []
+        for item in raw if isinstance(raw, list) else []:
             try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                
-                cleaned = response.text.replace("```json", "").replace("```", "").strip()
-                return [PainPoint(**item) for item in json.loads(cleaned)]
-            except Exception as e:
-                if "429" in str(e):
-                    time.sleep(5)
-                    try:
-                        response = model.generate_content(prompt)
-                        cleaned = response.text.replace("```json", "").replace("```", "").strip()
-                        return [PainPoint(**item) for item in json.loads(cleaned)]
-                    except:
-                        pass
+                pains.append(PainPoint(**item))
+            except Exception:
                 continue
-        
-        return []
+        return pains
 
     def _get_reddit_data(self, name: str) -> str:
         params = {
@@ -93,11 +402,8 @@ class MinerAgent:
             "num": 3
         }
         try:
-            results = GoogleSearch(params).get_dict().get("organic_results", [])
-            text = ""
-            for r in results:
-                text += f"Source: Reddit | Content: {r.get('snippet', '')}\n"
-            return text
+            results = cached_search(params, query_type="reddit").get("organic_results", [])
+            return self._pack_snippets(results, "Source: Reddit | Content: ")
         except:
             return ""
 
@@ -110,10 +416,16 @@ class MinerAgent:
             "num": 5
         }
         try:
-            results = GoogleSearch(params).get_dict().get("organic_results", [])
-            text = ""
-            for r in results:
-                text += f"Source: Review Site | Content: {r.get('snippet', '')}\n"
-            return text
+            results = cached_search(params, query_type="reviews").get("organic_results", [])
+            return self._pack_snippets(results, "Source: Review Site | Content: ")
         except:
-            return ""
\ No newline at end of file
+            return ""
+
+    def _pack_snippets(self, results: List[dict], label: str) -> str:
+        """Deduped, boilerplate-free snippets in search rank order, within the
+        per-competitor budget (whole snippets only)."""
+        builder = PromptBuilder(self.text_token_budget)
+        for rank, r in enumerate(results):
+            builder.add(r.get("snippet"), priority=-rank, label=label)
+        text = builder.build("miner")
+        return text + "\n" if text else ""
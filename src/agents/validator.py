@@ -1,75 +1,152 @@
 import os
-import time
-import json
-import google.generativeai as genai
-from serpapi import GoogleSearch
-from typing import List
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from ..state import PainPoint, ValidatedIdea
+from ..llm_client import get_llm_client, MALFORMED
+from ..structured_output import STRING_LIST
+from ..search_cache import cached_search
+from ..scoring import OpportunityScorer, ScoringWeights
+from ..instrumentation import context_map
+
+def _parse_count(value) -> int:
+    """SerpApi reports total_results as an int; older payloads as "About 1,234 results"."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = next((t for t in str(value or "").split() if t.replace(",", "").replace(".", "").isdigit()), "0")
+    return int(digits.replace(",", "").replace(".", ""))
 
 class ValidatorAgent:
-    def __init__(self, country_code: str = "us"):
+    def __init__(self, country_code: str = "us", max_pains: int = 5, max_workers: int = 5,
+                 weights: Optional[ScoringWeights] = None):
         self.serp_api_key = os.getenv("SERPAPI_KEY")
         self.country_code = country_code
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.available_models = []
-        
-        # --- DYNAMIC DISCOVERY ---
-        try:
-            all_models = list(genai.list_models())
-            valid_models = [m.name for m in all_models if 'generateContent' in m.supported_generation_methods]
-            self.available_models = sorted(valid_models, key=lambda x: 0 if 'flash' in x else (1 if 'pro' in x else 2))
-            print(f"   [Validator] System: Discovered {len(self.available_models)} usable AI models.")
-        except:
-            self.available_models = ['models/gemini-1.5-flash-latest']
+        self.max_pains = max_pains      # how many pains get a demand check
+        self.max_workers = max_workers  # concurrent SerpApi demand checks
+        self.llm = get_llm_client()
+        self.model_preference = "flash"
+
+        self.scorer = OpportunityScorer(weights)
+
+        # (keyword, metrics) already fetched per pain, so re-validation only runs the delta
+        self._memo: Dict[Tuple[str, str], Tuple[str, dict]] = {}
+        self._memo_lock = threading.Lock()
 
     def validate(self, pains: List[PainPoint]) -> List[ValidatedIdea]:
         if not pains:
             print("   [Validator] No pain points to validate.")
             return []
 
-        print(f"   [Validator] Validating {len(pains)} pain points...")
-        validated_ideas = []
+        selected = pains[:self.max_pains]
+        with self._memo_lock:
+            fresh = [p for p in selected if self._memo_key(p) not in self._memo]
+        print(f"   [Validator] Validating {len(fresh)} new of {len(selected)} selected pain points ({len(pains)} total)...")
+
+        checked = {}
+        if fresh:
+            for pain, demand in zip(fresh, self._check_demand(fresh)):
+                checked[self._memo_key(pain)] = demand
+                if demand is None:
+                    continue  # no usable keyword; retry it next time
+                with self._memo_lock:
+                    self._memo[self._memo_key(pain)] = demand
+
+        with self._memo_lock:
+            demands = [self._memo.get(self._memo_key(p)) or checked.get(self._memo_key(p)) for p in selected]
+        scored = [(p, d) for p, d in zip(selected, demands) if d is not None]
+        if len(scored) < len(selected):
+            print(f"   [Validator] {len(selected) - len(scored)} pain points got no usable keyword. Not scoring them.")
+        if not scored:
+            return []
+        return self._score_ideas([p for p, _ in scored], [d for _, d in scored])
+
+    def _memo_key(self, pain: PainPoint) -> Tuple[str, str]:
+        return (" ".join(pain.quote.lower().split()), pain.pain_category.strip().lower())
+
+    def _check_demand(self, selected: List[PainPoint]) -> List[Optional[Tuple[str, dict]]]:
+        """(keyword, metrics) per pain, in order; None where no keyword could be generated."""
+        # 1. One LLM call for every keyword
+        keywords = self._generate_keywords_batch(selected)
+        usable = [kw for kw in keywords if kw]
+
+        # 2. Fan the demand checks out concurrently
+        for kw in usable:
+            print(f"     Checking Demand for: '{kw}'...")
+        metrics = iter(self._map(self._check_google_metrics, usable))
+        return [(kw, next(metrics)) if kw else None for kw in keywords]
 
-        # Process top 5 unique pains
-        for pain in pains[:5]: 
-            target_keyword = self._generate_keyword_with_retry(pain)
-            print(f"     Checking Demand for: '{target_keyword}'...")
-            
-            metrics = self._check_google_metrics(target_keyword)
-            score = self._calculate_score(metrics)
+    def _score_ideas(self, pains: List[PainPoint], demands: List[Tuple[str, dict]]) -> List[ValidatedIdea]:
+        """Scores every candidate in one vectorized pass and returns them best-first."""
+        density = [m.get('ads_count', 0) for _, m in demands]
+        scores = self.scorer.score(
+            total_results=[m['total_results'] for _, m in demands],
+            frequency=[p.frequency for p in pains],
+            sentiment=[p.sentiment_score for p in pains],
+            competitor_density=density,
+        )
+        competition = self.scorer.competition(density)
 
-            idea = ValidatedIdea(
+        validated_ideas = []
+        for pain, (target_keyword, metrics), score, comp in zip(pains, demands, scores, competition):
+            validated_ideas.append(ValidatedIdea(
                 description=f"Solve '{pain.quote}'",
                 target_keyword=target_keyword,
-                search_volume=metrics['total_results'], 
-                cpc=0.0, 
-                difficulty=0, 
-                opportunity_score=score
-            )
-            validated_ideas.append(idea)
-            
-        return validated_ideas
-
-    def _generate_keyword_with_retry(self, pain: PainPoint) -> str:
-        prompt = f"Convert this pain point into a Google Search keyword that a buyer would type:\nPain: '{pain.quote}'\nCategory: {pain.pain_category}\nReturn JUST the keyword string:"
+                search_volume=metrics['total_results'],
+                cpc=0.0,  # SerpApi's organic search exposes no CPC
+                difficulty=int(round(100 * (1 - comp))),
+                opportunity_score=float(score)
+            ))
+
+        return [validated_ideas[i] for i in self.scorer.rank(scores)]
+
+    async def avalidate(self, pains: List[PainPoint]) -> List[ValidatedIdea]:
+        """Async entry point; demand checks already fan out inside validate()."""
+        return await asyncio.to_thread(self.validate, pains)
+
+    def _map(self, fn, items: list) -> list:
+        """Order-preserving concurrent map."""
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return context_map(pool, fn, items)
+
+    def _generate_keywords_batch(self, pains: List[PainPoint]) -> List[Optional[str]]:
+        """One keyword per pain, in order; None where the reply gave no usable keyword."""
+        if len(pains) == 1:
+            return [self._generate_keyword_with_retry(pains[0])]
+
+        listing = "\n".join(f"{i+1}. Pain: '{p.quote}' | Category: {p.pain_category}" for i, p in enumerate(pains))
+        prompt = f"""
+        Convert each pain point below into a Google Search keyword that a buyer would type.
         
-        # --- RETRY LOOP ---
-        for model_name in self.available_models:
-            try:
-                model = genai.GenerativeModel(model_name)
-                res = model.generate_content(prompt)
-                return res.text.strip().replace('"', '')
-            except Exception as e:
-                if "429" in str(e):
-                    time.sleep(5)
-                    try:
-                        res = model.generate_content(prompt)
-                        return res.text.strip().replace('"', '')
-                    except:
-                        pass
-                continue
+        {listing}
         
-        return "software alternative"
+        Return ONLY a raw JSON list of {len(pains)} keyword strings, in the same order. Example: ["keyword 1", "keyword 2"]
+        """
+
+        keywords = self.llm.generate_json(prompt, prefer=self.model_preference, schema=STRING_LIST)
+        if isinstance(keywords, list) and len(keywords) == len(pains):
+            return [self._clean_keyword(k) for k in keywords]
+        if keywords is MALFORMED or isinstance(keywords, list):
+            # A model answered, just not usably (a list of the wrong length can't be
+            # matched back to the pains); asking again per pain would only repeat the cost
+            print("     [!] Batched keyword reply was unusable. Skipping these pain points.")
+            return [None] * len(pains)
+
+        print("     [!] Batched keyword generation failed. Falling back to one call per pain.")
+        return self._map(self._generate_keyword_with_retry, pains)
+
+    def _generate_keyword_with_retry(self, pain: PainPoint) -> Optional[str]:
+        prompt = f"Convert this pain point into a Google Search keyword that a buyer would type:\nPain: '{pain.quote}'\nCategory: {pain.pain_category}\nReturn JUST the keyword string:"
+        
+        return self._clean_keyword(self.llm.generate(prompt, prefer=self.model_preference))
+
+    @staticmethod
+    def _clean_keyword(value) -> Optional[str]:
+        if not isinstance(value, str):
+            return None
+        return value.strip().replace('"', '') or None
 
     def _check_google_metrics(self, keyword: str) -> dict:
         params = {
@@ -79,16 +156,10 @@ class ValidatorAgent:
             "gl": self.country_code,
         }
         try:
-            results = GoogleSearch(params).get_dict()
-            total_results = results.get("search_information", {}).get("total_results", "0")
-            clean_count = int(total_results.split()[0].replace(',', '')) if total_results else 0
-            return {"total_results": clean_count}
+            results = cached_search(params, query_type="metrics")
         except:
-            return {"total_results": 0}
-
-    def _calculate_score(self, metrics: dict) -> float:
-        count = metrics['total_results']
-        if count > 100000: return 8.0 
-        if count > 10000: return 9.0 
-        if count > 1000: return 6.0 
-        return 2.0
\ No newline at end of file
+            return {"total_results": 0, "ads_count": 0}
+        # Advertisers bidding on the keyword = paid competitor density
+        ads_count = len(results.get("ads") or [])
+        total_results = (results.get("search_information") or {}).get("total_results")
+        return {"total_results": _parse_count(total_results), "ads_count": ads_count}
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import asyncio
+from typing import AsyncIterator, Dict, Optional
+from .state import ResearchStage
+from .supervisor import SupervisorAgent
+from .checkpoint import CheckpointStore
+from .cache import content_key
+
+class BatchRunner:
+    """Headless research over a JSONL file of niches.
+
+    Each input line is an object with a "niche" (and optional "country_code").
+    Jobs run through a bounded pool of async workers, the hunting checkpoint is
+    auto-approved, and one result line is appended to `output_path` per job as
+    soon as it finishes.
+
+    Every job gets a project_id derived from (niche, country), so re-running the
+    same file after a crash resumes each job from its last checkpoint; repeated
+    lines for the same project_id are skipped, so two workers never research the
+    same project at once. Jobs that
+    completed within `reuse_days` are reported from their checkpoint; older ones
+    are researched again from scratch.
+    """
+
+    def __init__(self, input_path: str, output_path: str = "reports/batch_results.jsonl",
+                 workers: int = 4, default_country: str = "in", reuse_days: float = 1):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.workers = workers
+        self.default_country = default_country
+        self.reuse_seconds = reuse_days * 24 * 3600
+        self.checkpoints = CheckpointStore()
+
+    def run(self) -> Dict[str, int]:
+        return asyncio.run(self.arun())
+
+    async def arun(self) -> Dict[str, int]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        counts = {"completed": 0, "failed": 0, "skipped": 0}
+
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            async def worker():
+                while True:
+                    job = await queue.get()
+                    if job is None:
+                        queue.task_done()
+                        return
+                    result = await self._run_job(job)
+                    counts["completed" if result["status"] == "completed" else "failed"] += 1
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    queue.task_done()
+
+            tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+
+            # Stream the input; the bounded queue keeps memory flat for huge files
+            async for job in self._read_jobs(counts):
+                await queue.put(job)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+
+        print(f"--- Batch finished: {counts} -> {self.output_path} ---")
+        return counts
+
+    async def _read_jobs(self, counts: Dict[str, int]) -> AsyncIterator[dict]:
+        seen = set()
+        with open(self.input_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    print(f"   [Batch] Line {line_no}: invalid JSON, skipped.")
+                    counts["skipped"] += 1
+                    continue
+                if not isinstance(job, dict) or not job.get("niche"):
+                    print(f"   [Batch] Line {line_no}: no 'niche' field, skipped.")
+                    counts["skipped"] += 1
+                    continue
+                country = job.get("country_code") or job.get("country") or self.default_country
+                project_id = job.get("project_id") or \
+                    f"batch_{content_key([job['niche'].strip().lower(), country.lower()])[:12]}"
+                if project_id in seen:
+                    print(f"   [Batch] Line {line_no}: duplicate of an earlier job ({project_id}), skipped.")
+                    counts["skipped"] += 1
+                    continue
+                seen.add(project_id)
+                yield {**job, "country_code": country, "project_id": project_id}
+
+    async def _run_job(self, job: dict) -> dict:
+        niche = job["niche"]
+        country = job["country_code"]
+        project_id = job["project_id"]
+        started = time.time()
+        supervisor: Optional[SupervisorAgent] = None
+        error = None
+        reused = False
+
+        try:
+            supervisor = SupervisorAgent.resume(project_id, checkpoints=self.checkpoints)
+            if supervisor and supervisor.state.current_stage == ResearchStage.COMPLETED:
+                age = self.checkpoints.age(project_id)
+                if age is not None and age <= self.reuse_seconds:
+                    reused = True
+                    print(f"   [Batch] '{niche}' completed {age / 3600:.1f}h ago. Reusing its results.")
+                else:
+                    print(f"   [Batch] '{niche}' results are stale. Researching again...")
+                    supervisor = None
+            if supervisor is None:
+                supervisor = SupervisorAgent(niche=niche, country_code=country,
+                                             project_id=project_id, checkpoints=self.checkpoints)
+            state = await supervisor.arun()
+
+            # Auto-approve the human checkpoint
+            if state.current_stage == ResearchStage.HUNTING_REVIEW:
+                state.add_log("Batch mode: competitors auto-approved.")
+                state.current_stage = ResearchStage.MINING
+                state = await supervisor.arun()
+        except Exception as e:
+            error = str(e)
+            print(f"   [Batch] '{niche}' failed: {e}")
+
+        state = supervisor.state if supervisor else None
+        completed = state is not None and state.current_stage == ResearchStage.COMPLETED
+        top = state.final_ideas[0] if completed and state.final_ideas else None
+        report_path = supervisor.report_path if supervisor else None
+        if reused:
+            markdown = supervisor.reporter.paths_for(state)["markdown"]
+            report_path = markdown if os.path.exists(markdown) else None
+        return {
+            "niche": niche,
+            "country_code": country,
+            "project_id": state.project_id if state else None,
+            "status": "completed" if completed else "failed",
+            "stage": state.current_stage.value if state else None,
+            "competitors": len(state.competitors) if state else 0,
+            "pain_points": len(state.pain_points) if state else 0,
+            "top_keyword": top.target_keyword if top else None,
+            "top_score": top.opportunity_score if top else None,
+            "report_path": report_path,
+            "reused": reused,
+            "elapsed_seconds": round(time.time() - started, 2),
+            "error": error,
+        }
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Optional
+
+def content_key(payload: Any) -> str:
+    """Stable sha256 of a JSON-serializable payload."""
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """Content-addressed JSON cache on local disk.
+
+    Entries expire by TTL (checked on read) and the directory is kept under
+    `max_bytes` by evicting least-recently-used files (hits bump mtime).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024, default_ttl: int = 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = self._scan_size()
+
+    def get(self, key: str, ttl: Optional[int] = None) -> Optional[Any]:
+        ttl = self.default_ttl if ttl is None else ttl
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry.get("stored_at", 0) > ttl:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU bookkeeping
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry.get("value")
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        blob = json.dumps({"stored_at": time.time(), "value": value}, ensure_ascii=False)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"   [Cache] Warning: Could not write {path} ({e}).")
+            return
+
+        with self._lock:
+            self._size += len(blob.encode("utf-8")) - old_size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "bytes": self._size,
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def _evict(self):
+        # Drop oldest-touched entries until we are back under 90% of budget
+        target = int(self.max_bytes * 0.9)
+        for path, _, _ in sorted(self._entries(), key=lambda e: e[2]):
+            if self._size <= target:
+                break
+            self._remove(path)
@@ -0,0 +1,56 @@
+import os
+import time
+import threading
+from typing import List, Optional
+from .state import ResearchState
+
+class CheckpointStore:
+    """Durable ResearchState snapshots, one JSON file per project_id.
+
+    Writes go to a temp file and are renamed into place, so a crash mid-write
+    never leaves a truncated checkpoint behind.
+    """
+
+    def __init__(self, directory: str = ".checkpoints"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, state: ResearchState):
+        path = self._path(state.project_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(state.model_dump_json(indent=2))
+        os.replace(tmp_path, path)
+
+    def load(self, project_id: str) -> Optional[ResearchState]:
+        try:
+            with open(self._path(project_id), "r", encoding="utf-8") as f:
+                return ResearchState.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"   [Checkpoint] Warning: Unreadable checkpoint for {project_id} ({e}).")
+            return None
+
+    def exists(self, project_id: str) -> bool:
+        return os.path.exists(self._path(project_id))
+
+    def age(self, project_id: str) -> Optional[float]:
+        """Seconds since the checkpoint was last saved, or None if there is none."""
+        try:
+            return time.time() - os.path.getmtime(self._path(project_id))
+        except OSError:
+            return None
+
+    def list_ids(self) -> List[str]:
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def delete(self, project_id: str):
+        try:
+            os.remove(self._path(project_id))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, project_id: str) -> str:
+        safe_id = "".join(c for c in project_id if c.isalnum() or c in ("_", "-"))
+        return os.path.join(self.directory, f"{safe_id}.json")
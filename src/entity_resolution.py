@@ -0,0 +1,92 @@
+import re
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from .knowledge_store import KnowledgeStore, get_knowledge_store
+
+_TLDS = {"com", "io", "ai", "co", "app", "net", "org", "in", "so", "dev", "us", "uk", "biz"}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Hosts whose URLs say nothing about the product (Hunter links to a Google search)
+_NON_PRODUCT_HOSTS = ("google.", "bing.", "duckduckgo.")
+
+def normalize_name(name: str) -> str:
+    """Case, punctuation, scheme and TLDs only: 'acme.io' -> 'acme', 'Zoho-CRM' -> 'zoho crm'.
+    Every word is kept, since 'Zoho CRM' and 'Zoho ERP' are different products;
+    'Acme CRM' joins 'Acme' only through a shared domain or an exact alias."""
+    text = name.strip().lower()
+    text = re.sub(r"^[a-z]+://", "", text).removeprefix("www.")
+    if " " not in text and "." in text:
+        # Looks like a domain: keep the registrable label(s), drop the TLDs
+        labels = text.split("/")[0].split(".")
+        while len(labels) > 1 and labels[-1] in _TLDS:
+            labels.pop()
+        text = " ".join(labels)
+    return " ".join(_TOKEN_RE.findall(text))
+
+def domain_key(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    host = urlsplit(url if "://" in url else f"https://{url}").netloc.lower()
+    if not host or any(h in host for h in _NON_PRODUCT_HOSTS):
+        return None
+    return normalize_name(host) or None
+
+def _token_key(key: str) -> str:
+    """Word order doesn't matter: 'books zoho' and 'zoho books' are one product."""
+    return " ".join(sorted(set(key.split())))
+
+class EntityResolver:
+    """Maps free-form competitor names/domains to a stable canonical id.
+
+    A name matches a known entity only through an exact alias, the same
+    product domain, or the same set of words once normalized; anything else
+    becomes a new entity. There is deliberately no fuzzy matching: similar
+    spellings of different products ("Zoho Books" / "Zoho Bookings",
+    "Clinicea" / "Clinic Cloud") must never merge. Aliases persist in the
+    knowledge store, so ids are shared across runs and processes.
+    """
+
+    def __init__(self, store: Optional[KnowledgeStore] = None):
+        self.store = store or get_knowledge_store()
+        self._lock = threading.Lock()
+        self._aliases: Dict[str, str] = {}
+        self._by_tokens: Dict[str, str] = {}
+        for alias, canonical in self.store.load_aliases().items():
+            self._remember(alias, canonical)
+
+    def resolve(self, name: str, url: Optional[str] = None) -> str:
+        key = normalize_name(name)
+        domain = domain_key(url)
+        with self._lock:
+            canonical = self._lookup(key) or (domain and self._lookup(domain))
+            if canonical is None:
+                canonical = key.replace(" ", "-") or name.strip().lower()
+            for alias in (key, domain):
+                if alias and alias not in self._aliases:
+                    # Another process may have claimed the alias first; its id wins
+                    self._remember(alias, self.store.register_alias(alias, canonical))
+            return self._aliases.get(key, canonical)
+
+    def _remember(self, alias: str, canonical: str):
+        self._aliases[alias] = canonical
+        self._by_tokens.setdefault(_token_key(alias), canonical)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        if not key:
+            return None
+        if key in self._aliases:
+            return self._aliases[key]
+        return self._by_tokens.get(_token_key(key))
+
+
+_resolver: Optional[EntityResolver] = None
+_resolver_lock = threading.Lock()
+
+def get_entity_resolver() -> EntityResolver:
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = EntityResolver()
+    return _resolver
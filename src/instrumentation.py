@@ -0,0 +1,86 @@
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+from .state import ResearchState, Span
+
+CHARS_PER_TOKEN = 4  # rough estimate for Gemini-family tokenizers
+
+_current_tracer: contextvars.ContextVar = contextvars.ContextVar("tracer", default=None)
+
+class Tracer:
+    """Collects spans into a ResearchState (stage timings and every external call)."""
+
+    def __init__(self, state: ResearchState):
+        self.state = state
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes):
+        """Times the block; the yielded dict can be filled with more attributes."""
+        attrs: Dict[str, Any] = dict(attributes)
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = str(e)
+            raise
+        finally:
+            record = Span(
+                name=name,
+                kind=kind,
+                started_at=started,
+                duration_ms=round((time.perf_counter() - t0) * 1000, 1),
+                attributes=attrs,
+            )
+            with self._lock:
+                self.state.spans.append(record)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-kind totals: count, wall time, and the headline cost counters."""
+        out: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.state.spans)
+        for s in spans:
+            row = out.setdefault(s.kind, {"count": 0, "ms": 0.0, "cache_hits": 0, "est_tokens": 0,
+                                         "serpapi_queries": 0, "tokens_saved": 0})
+            row["count"] += 1
+            row["ms"] = round(row["ms"] + s.duration_ms, 1)
+            row["cache_hits"] += 1 if s.attributes.get("cache_hit") else 0
+            row["est_tokens"] += s.attributes.get("est_tokens", 0)
+            row["serpapi_queries"] += s.attributes.get("serpapi_queries", 0)
+            row["tokens_saved"] += s.attributes.get("tokens_saved", 0)
+        return out
+
+@contextmanager
+def use_tracer(tracer: Optional[Tracer]):
+    """Makes `tracer` the active one for this context (and threads/tasks spawned via it)."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+@contextmanager
+def trace(name: str, kind: str, **attributes):
+    """Span on the active tracer; a no-op (still yields a dict) when none is active."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield dict(attributes)
+        return
+    with tracer.span(name, kind, **attributes) as attrs:
+        yield attrs
+
+def context_map(pool, fn, items: Iterable) -> List:
+    """pool.map that carries the caller's context (e.g. the active tracer) into workers."""
+    calls = [(contextvars.copy_context(), item) for item in items]
+    return list(pool.map(lambda call: call[0].run(fn, call[1]), calls))
+
+def export_spans_jsonl(state: ResearchState, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for s in state.spans:
+            row = {"project_id": state.project_id, **s.model_dump()}
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,226 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from .state import Competitor, PainPoint, ValidatedIdea, ResearchState
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    project_id TEXT PRIMARY KEY,
+    niche TEXT NOT NULL,
+    niche_key TEXT NOT NULL,
+    country_code TEXT NOT NULL,
+    completed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS competitors (
+    project_id TEXT NOT NULL,
+    niche_key TEXT NOT NULL,
+    country_code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    url TEXT,
+    recorded_at REAL NOT NULL,
+    is_relevant INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS pain_points (
+    project_id TEXT NOT NULL,
+    niche_key TEXT NOT NULL,
+    country_code TEXT NOT NULL,
+    competitor_key TEXT,
+    source TEXT,
+    quote TEXT NOT NULL,
+    pain_category TEXT,
+    sentiment_score REAL,
+    frequency INTEGER,
+    recorded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ideas (
+    project_id TEXT NOT NULL,
+    niche_key TEXT NOT NULL,
+    country_code TEXT NOT NULL,
+    description TEXT,
+    target_keyword TEXT,
+    search_volume INTEGER,
+    cpc REAL,
+    difficulty INTEGER,
+    opportunity_score REAL,
+    recorded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias_key TEXT PRIMARY KEY,
+    canonical_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_competitors_name ON competitors(name_key, country_code);
+CREATE INDEX IF NOT EXISTS idx_competitors_niche ON competitors(niche_key, country_code);
+CREATE INDEX IF NOT EXISTS idx_pains_competitor ON pain_points(competitor_key, country_code);
+CREATE INDEX IF NOT EXISTS idx_pains_niche ON pain_points(niche_key, country_code);
+CREATE INDEX IF NOT EXISTS idx_pains_category ON pain_points(pain_category);
+CREATE INDEX IF NOT EXISTS idx_ideas_niche ON ideas(niche_key, country_code);
+"""
+
+def _key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class KnowledgeStore:
+    """Cross-run SQLite index of competitors, pains and ideas.
+
+    Filled from each completed ResearchState; agents query it to skip work
+    another run already did within `freshness_days`.
+    """
+
+    def __init__(self, path: str = ".cache/knowledge.db", freshness_days: float = 14):
+        self.path = path
+        self.max_age = freshness_days * 24 * 3600
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Stores created before every hunted competitor (not just approved ones) was kept
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(competitors)")}
+            if "is_relevant" not in columns:
+                conn.execute("ALTER TABLE competitors ADD COLUMN is_relevant INTEGER NOT NULL DEFAULT 1")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def _cutoff(self, max_age: Optional[float]) -> float:
+        return time.time() - (self.max_age if max_age is None else max_age)
+
+    # --- Writes ---
+
+    def save_state(self, state: ResearchState):
+        now = time.time()
+        niche_key, country = _key(state.niche), state.country_code.lower()
+        # Competitors are keyed by canonical id when resolved, so runs that
+        # spelled a product differently still join up
+        comp_keys = {c.name: c.canonical_id or _key(c.name) for c in state.competitors}
+        with self._write_lock, self._connect() as conn:
+            # Re-saving a project replaces its rows
+            for table in ("runs", "competitors", "pain_points", "ideas"):
+                conn.execute(f"DELETE FROM {table} WHERE project_id = ?", (state.project_id,))
+
+            conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                         (state.project_id, state.niche, niche_key, country, now))
+            conn.executemany(
+                "INSERT INTO competitors VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(state.project_id, niche_key, country, c.name, comp_keys[c.name], c.url, now, int(c.is_relevant))
+                 for c in state.competitors],
+            )
+            conn.executemany(
+                "INSERT INTO pain_points VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(state.project_id, niche_key, country, comp_keys.get(comp, _key(comp)) if comp else None, p.source, p.quote,
+                  p.pain_category, p.sentiment_score, p.frequency, now)
+                 for p in state.pain_points for comp in (p.competitors or [None])],
+            )
+            conn.executemany(
+                "INSERT INTO ideas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(state.project_id, niche_key, country, i.description, i.target_keyword, i.search_volume,
+                  i.cpc, i.difficulty, i.opportunity_score, now)
+                 for i in state.final_ideas],
+            )
+
+    def register_alias(self, alias_key: str, canonical_id: str) -> str:
+        """Records alias -> canonical id unless the alias is already taken; returns the stored id."""
+        with self._write_lock, self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO aliases VALUES (?, ?, ?)", (alias_key, canonical_id, time.time()))
+            row = conn.execute("SELECT canonical_id FROM aliases WHERE alias_key = ?", (alias_key,)).fetchone()
+        return row[0]
+
+    # --- Reads ---
+
+    def load_aliases(self) -> Dict[str, str]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT alias_key, canonical_id FROM aliases").fetchall())
+
+    def recent_competitors(self, niche: str, country_code: str, max_age: Optional[float] = None) -> List[Competitor]:
+        """Every competitor the freshest run of this niche+country hunted (with the
+        relevance its analyst gave it), if recent enough."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT project_id FROM runs WHERE niche_key = ? AND country_code = ? AND completed_at >= ? "
+                "ORDER BY completed_at DESC LIMIT 1",
+                (_key(niche), country_code.lower(), self._cutoff(max_age)),
+            ).fetchone()
+            if not row:
+                return []
+            rows = conn.execute("SELECT name, url, name_key, is_relevant FROM competitors WHERE project_id = ?",
+                                (row[0],)).fetchall()
+        # name_key is the canonical id it was saved under, so re-saving keeps the join key
+        return [Competitor(name=name, url=url or "", is_relevant=bool(relevant), canonical_id=key)
+                for name, url, key, relevant in rows]
+
+    def recent_pains_for(self, competitor_name: str, country_code: str, max_age: Optional[float] = None,
+                         key: Optional[str] = None) -> Optional[List[PainPoint]]:
+        """Pains from the newest fresh run that found any for this competitor, or None.
+        A run that stored none (e.g. mined during an outage) doesn't count as mined.
+        `key` is the competitor's canonical id; defaults to its normalized name."""
+        key = key or _key(competitor_name)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT p.project_id FROM pain_points p JOIN runs r ON r.project_id = p.project_id "
+                "WHERE p.competitor_key = ? AND p.country_code = ? AND r.completed_at >= ? "
+                "ORDER BY r.completed_at DESC LIMIT 1",
+                (key, country_code.lower(), self._cutoff(max_age)),
+            ).fetchone()
+            if not row:
+                return None
+            rows = conn.execute(
+                "SELECT source, quote, pain_category, sentiment_score FROM pain_points "
+                "WHERE project_id = ? AND competitor_key = ?",
+                (row[0], key),
+            ).fetchall()
+        # Stored frequencies are cluster totals; a reused signal counts once
+        return [PainPoint(source=s, quote=q, pain_category=c, sentiment_score=sent, competitors=[competitor_name])
+                for s, q, c, sent in rows]
+
+    def pains_by_category(self, category: str, country_code: Optional[str] = None, limit: int = 100) -> List[PainPoint]:
+        # DISTINCT: a pain shared by several competitors is stored once per competitor
+        sql = ("SELECT DISTINCT project_id, source, quote, pain_category, sentiment_score, frequency, recorded_at "
+               "FROM pain_points WHERE pain_category = ?")
+        args: list = [category]
+        if country_code:
+            sql += " AND country_code = ?"
+            args.append(country_code.lower())
+        sql += " ORDER BY recorded_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return [PainPoint(source=s, quote=q, pain_category=c, sentiment_score=sent, frequency=f)
+                for _, s, q, c, sent, f, _ in rows]
+
+    def ideas(self, niche: Optional[str] = None, country_code: Optional[str] = None) -> List[ValidatedIdea]:
+        sql, args = "SELECT description, target_keyword, search_volume, cpc, difficulty, opportunity_score FROM ideas WHERE 1=1", []
+        if niche:
+            sql += " AND niche_key = ?"
+            args.append(_key(niche))
+        if country_code:
+            sql += " AND country_code = ?"
+            args.append(country_code.lower())
+        sql += " ORDER BY opportunity_score DESC"
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return [ValidatedIdea(description=d, target_keyword=k, search_volume=v, cpc=cpc, difficulty=diff, opportunity_score=s)
+                for d, k, v, cpc, diff, s in rows]
+
+
+_store: Optional[KnowledgeStore] = None
+_store_lock = threading.Lock()
+
+def get_knowledge_store() -> KnowledgeStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = KnowledgeStore()
+    return _store
@@ -0,0 +1,34 @@
+import hashlib
+import threading
+from typing import Optional
+from .cache import DiskCache, content_key
+
+class LLMCache(DiskCache):
+    """Persistent cache of raw Gemini responses keyed on (model, prompt hash)."""
+
+    def __init__(self, directory: str = ".cache/llm", max_bytes: int = 50 * 1024 * 1024,
+                 ttl_seconds: int = 7 * 24 * 3600):
+        super().__init__(directory, max_bytes=max_bytes, default_ttl=ttl_seconds)
+
+    @staticmethod
+    def key_for(model_name: str, prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return content_key({"model": model_name, "prompt": prompt_hash})
+
+    def lookup(self, model_name: str, prompt: str) -> Optional[str]:
+        return self.get(self.key_for(model_name, prompt))
+
+    def store(self, model_name: str, prompt: str, text: str):
+        self.set(self.key_for(model_name, prompt), text)
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
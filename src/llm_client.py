@@ -0,0 +1,229 @@
+import os
+import time
+import json
+import random
+import hashlib
+import threading
+import google.generativeai as genai
+from typing import Any, Callable, Dict, List, Optional
+from .model_registry import get_registry
+from .rate_limit import get_limiter
+from .llm_cache import get_llm_cache
+from .single_flight import SingleFlight
+from .instrumentation import trace, CHARS_PER_TOKEN
+from .structured_output import SchemaSource, gemini_schema, expected_type, parse_json_text
+
+class _Malformed:
+    """What generate() returns when a model answered but the reply couldn't be
+    parsed even after repair. Falsy, so `if result:` checks treat it as a
+    failure; batch callers compare `is MALFORMED` to skip their per-item
+    fallback, since re-asking would only pay for the same answer again."""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "MALFORMED"
+
+MALFORMED = _Malformed()
+
+def _classify_error(e: Exception) -> str:
+    msg = str(e).lower()
+    if "response_schema" in msg or "response_mime_type" in msg or "json mode" in msg:
+        return "unsupported_config"
+    if "429" in msg or "quota" in msg or "resource exhausted" in msg or "resourceexhausted" in msg:
+        return "rate_limit"
+    if "404" in msg or "not found" in msg or "notfound" in msg:
+        return "not_found"
+    return "other"
+
+def _gemini_model(model_name: str):
+    return genai.GenerativeModel(model_name)
+
+# Builds the object whose generate_content(prompt[, generation_config=...]).text we call; swappable
+# so benchmarks can replay recorded responses offline.
+_model_factory: Callable[[str], Any] = _gemini_model
+
+def set_model_factory(factory: Optional[Callable[[str], Any]] = None):
+    """None restores the live Gemini models."""
+    global _model_factory
+    _model_factory = factory or _gemini_model
+
+class LLMClient:
+    """Shared Gemini access for all agents.
+
+    - one token bucket per model (shared by every agent and thread)
+    - jittered exponential backoff on 429s instead of a fixed 5s sleep
+    - circuit breaker: models that 404 or stay over quota are skipped for a while
+    - counters for calls, retries, fallbacks and time spent waiting
+    - persistent response cache, so a repeated prompt costs no call at all
+    - single-flight: concurrent identical prompts share one in-flight call
+    - JSON mode with a response schema; a reply that can't be parsed even
+      after repair fails the call instead of paying for another model
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 breaker_cooldown: float = 300.0):
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_cooldown = breaker_cooldown
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "fallbacks": 0,
+            "circuit_trips": 0,
+            "wait_seconds": 0.0,
+            "cache_hits": 0,
+            "parse_failures": 0,
+        }
+
+    def generate(self, prompt: str, prefer: str = "flash", parse: Optional[Callable[[str], Any]] = None,
+                 use_cache: bool = True, generation_config: Optional[dict] = None) -> Optional[Any]:
+        """Returns the response text (or parse(text)), or None if every model failed.
+
+        A reply that parse() rejects returns MALFORMED without trying another model.
+        Pass use_cache=False at call sites that need a fresh answer.
+        """
+        with trace("llm.generate", kind="llm", prefer=prefer, chars_sent=len(prompt),
+                   est_tokens=len(prompt) // CHARS_PER_TOKEN) as span:
+            candidates = self._candidates(prefer)
+            cache = get_llm_cache() if use_cache else None
+
+            if cache:
+                for model_name in candidates:
+                    text = cache.lookup(model_name, prompt)
+                    if text is None:
+                        continue
+                    try:
+                        result = parse(text) if parse else text
+                    except Exception:
+                        continue
+                    self._count("cache_hits")
+                    span.update(cache_hit=True, model=model_name, est_tokens=0)
+                    return result
+
+            # Identical prompts already in flight share one call and its result
+            config_key = json.dumps(generation_config, sort_keys=True) if generation_config else None
+            flight_key = (prefer, hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+                          getattr(parse, "__qualname__", None), use_cache, config_key)
+            span.update(cache_hit=False, retries=0, fallbacks=0, wait_s=0.0)
+            return self._flights.do(flight_key, lambda: self._call_models(
+                prompt, candidates, parse, cache, span, generation_config))
+
+    def _call_models(self, prompt: str, candidates: List[str], parse: Optional[Callable[[str], Any]],
+                     cache, span: dict, generation_config: Optional[dict] = None) -> Optional[Any]:
+        for model_name in candidates:
+            model = _model_factory(model_name)
+            config = generation_config
+            for attempt in range(self.max_retries + 1):
+                waited = get_limiter(f"gemini:{model_name}").acquire()
+                self._add_wait(waited)
+                span["wait_s"] = round(span["wait_s"] + waited, 3)
+                self._count("calls")
+                try:
+                    if config:
+                        response = model.generate_content(prompt, generation_config=config)
+                    else:
+                        response = model.generate_content(prompt)
+                    text = response.text
+                except Exception as e:
+                    kind = _classify_error(e)
+                    if kind == "unsupported_config" and config:
+                        # Older models reject JSON mode; ask again in plain text
+                        print(f"     [LLM] {model_name} rejected JSON mode. Retrying without it...")
+                        config = None
+                        continue
+                    if kind == "rate_limit" and attempt < self.max_retries:
+                        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                        delay = random.uniform(delay / 2, delay)  # jitter
+                        print(f"     [LLM] Rate limit on {model_name}. Backing off {delay:.1f}s...")
+                        self._count("retries")
+                        self._add_wait(delay)
+                        span["retries"] += 1
+                        span["wait_s"] = round(span["wait_s"] + delay, 3)
+                        time.sleep(delay)
+                        continue
+                    if kind in ("rate_limit", "not_found"):
+                        self._trip(model_name)
+                    break
+
+                self._count("successes")
+                span.update(model=model_name, chars_received=len(text))
+                try:
+                    result = parse(text) if parse else text
+                except Exception as e:
+                    # The call was paid for; another model would only repeat it
+                    print(f"     [LLM] Unparseable reply from {model_name}: {e}")
+                    self._count("parse_failures")
+                    span["parse_failed"] = True
+                    return MALFORMED
+                if cache:
+                    cache.store(model_name, prompt, text)
+                return result
+
+            self._count("fallbacks")
+            span["fallbacks"] += 1
+
+        self._count("failures")
+        span["failed"] = True
+        return None
+
+    def generate_json(self, prompt: str, prefer: str = "flash", use_cache: bool = True,
+                      schema: Optional[SchemaSource] = None) -> Optional[Any]:
+        """JSON mode. `schema` (a Pydantic model or a schema dict, see
+        structured_output) constrains the reply's shape."""
+        config = {"response_mime_type": "application/json"}
+        if schema is not None:
+            config["response_schema"] = gemini_schema(schema)
+        expect = expected_type(config.get("response_schema"))
+        return self.generate(prompt, prefer=prefer, parse=lambda text: parse_json_text(text, expect),
+                             use_cache=use_cache, generation_config=config)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+            stats["coalesced"] = self._flights.shared
+            stats["open_circuits"] = [m for m, t in self._open_until.items() if t > time.time()]
+        return stats
+
+    def _candidates(self, prefer: str) -> List[str]:
+        now = time.time()
+        models = get_registry().preferred(prefer)
+        healthy = [m for m in models if self._open_until.get(m, 0) <= now]
+        # If everything is tripped, try anyway rather than fail without a call
+        return healthy or models
+
+    def _trip(self, model_name: str):
+        print(f"     [LLM] Circuit open for {model_name} ({int(self.breaker_cooldown)}s).")
+        with self._lock:
+            self._open_until[model_name] = time.time() + self.breaker_cooldown
+            self.metrics["circuit_trips"] += 1
+
+    def _count(self, key: str):
+        with self._lock:
+            self.metrics[key] += 1
+
+    def _add_wait(self, seconds: float):
+        if seconds:
+            with self._lock:
+                self.metrics["wait_seconds"] += seconds
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
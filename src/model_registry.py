@@ -0,0 +1,117 @@
+import os
+import time
+import json
+import threading
+import google.generativeai as genai
+from typing import List, Optional
+
+FALLBACK_MODELS = ['models/gemini-1.5-flash-latest']
+
+class ModelRegistry:
+    """Process-wide Gemini model discovery.
+
+    Discovers once, persists the list to disk with a TTL and hands each
+    agent its own preference order ("flash" first or "pro" first). A failed
+    discovery serves FALLBACK_MODELS without keeping them, and is retried
+    once `retry_seconds` have passed.
+    """
+
+    def __init__(self, cache_path: str = ".cache/models.json", ttl_seconds: int = 24 * 3600,
+                 retry_seconds: float = 60):
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._models: Optional[List[str]] = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def models(self) -> List[str]:
+        """All usable models (memory -> disk cache -> live discovery)."""
+        models = self._models
+        if models is not None:
+            return models
+
+        with self._lock:
+            if self._models is not None:
+                return self._models
+            if time.monotonic() < self._retry_at:
+                return list(FALLBACK_MODELS)
+            return self._store(self._load_from_disk() or self._discover())
+
+    def preferred(self, prefer: str = "flash") -> List[str]:
+        """Models sorted with `prefer` ('flash' or 'pro') first, the other tier second."""
+        other = "pro" if prefer == "flash" else "flash"
+        return sorted(self.models(), key=lambda x: 0 if prefer in x else (1 if other in x else 2))
+
+    def seed(self, models: List[str]):
+        """Use this list as-is, without discovery (offline runs and benchmarks)."""
+        with self._lock:
+            self._models = list(models)
+
+    def refresh(self) -> List[str]:
+        """Drop both caches and rediscover; a failed rediscovery keeps the last good list."""
+        with self._lock:
+            models = self._discover()
+            if models is None and self._models is not None:
+                return self._models
+            return self._store(models)
+
+    def _store(self, models: Optional[List[str]]) -> List[str]:
+        # Caller holds the lock; None means discovery failed
+        if models is None:
+            self._retry_at = time.monotonic() + self.retry_seconds
+            return list(FALLBACK_MODELS)
+        self._models = models
+        return models
+
+    def _load_from_disk(self) -> Optional[List[str]]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if time.time() - data.get("discovered_at", 0) > self.ttl_seconds:
+                return None
+            return data.get("models") or None
+        except (OSError, ValueError):
+            return None
+
+    def _discover(self) -> Optional[List[str]]:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        try:
+            all_models = list(genai.list_models())
+            valid_models = [
+                m.name for m in all_models
+                if 'generateContent' in m.supported_generation_methods
+            ]
+            print(f"   [Registry] Discovered {len(valid_models)} usable AI models.")
+        except Exception as e:
+            print(f"   [Registry] Warning: Model discovery failed ({e}). Using fallback for {self.retry_seconds:g}s.")
+            return None
+
+        if not valid_models:
+            return None
+
+        self._save_to_disk(valid_models)
+        return valid_models
+
+    def _save_to_disk(self, models: List[str]):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"discovered_at": time.time(), "models": models}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"   [Registry] Warning: Could not persist model cache ({e}).")
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    """The shared registry used by every agent in this process."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
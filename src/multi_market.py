@@ -0,0 +1,160 @@
+import time
+import uuid
+import asyncio
+import threading
+from typing import Dict, List, Optional
+from .state import ResearchState, ResearchStage, ProductSpec
+from .supervisor import SupervisorAgent
+from .agents.architect import ArchitectAgent
+from .report_generator import ReportGenerator
+from .checkpoint import CheckpointStore
+from .entity_resolution import normalize_name
+from .instrumentation import use_tracer
+
+class _DeferredSpec:
+    """Stands in for the architect inside each market's supervisor; the spec is
+    drafted once for all markets after they finish."""
+
+    def create_spec(self, idea, pains) -> None:
+        return None
+
+    async def acreate_spec(self, idea, pains) -> None:
+        return None
+
+def compare_markets(niche: str, states: List[ResearchState]) -> Dict:
+    """Per-market demand and competitor overlap for one niche."""
+    markets, presence = [], {}
+    for state in states:
+        scores = [i.opportunity_score for i in state.final_ideas]
+        top = state.final_ideas[0] if state.final_ideas else None
+        relevant = [c for c in state.competitors if c.is_relevant]
+        markets.append({
+            "country_code": state.country_code,
+            "project_id": state.project_id,
+            "status": state.current_stage.value,
+            "competitors": [c.name for c in relevant],
+            "pain_points": len(state.pain_points),
+            "ideas": len(state.final_ideas),
+            "top_keyword": top.target_keyword if top else None,
+            "top_score": top.opportunity_score if top else None,
+            "mean_score": round(sum(scores) / len(scores), 1) if scores else None,
+        })
+        for comp in relevant:
+            key = comp.canonical_id or normalize_name(comp.name)
+            entry = presence.setdefault(key, {"name": comp.name, "markets": []})
+            if state.country_code not in entry["markets"]:
+                entry["markets"].append(state.country_code)
+
+    scored = [m for m in markets if m["top_score"] is not None]
+    best = max(scored, key=lambda m: m["top_score"]) if scored else None
+    return {
+        "niche": niche,
+        "markets": markets,
+        "best_market": best["country_code"] if best else None,
+        "competitors": presence,
+        "shared_competitors": [e["name"] for e in presence.values() if len(e["markets"]) == len(states)],
+    }
+
+class MultiMarketResearch:
+    """Runs one niche across several markets (SerpApi `gl` codes) concurrently.
+
+    Work that doesn't depend on the country is done once: the caller verifies
+    the niche once, snippets that come back identical in several markets are
+    analyzed once (shared miner memo, LLM cache and single-flight), and the
+    architect drafts a single spec from the best idea across all markets.
+    Competitor review is auto-approved. Exposes progress like ResearchJob.
+    """
+
+    def __init__(self, niche: str, country_codes: List[str], project_id: Optional[str] = None,
+                 architect: Optional[ArchitectAgent] = None, reporter: Optional[ReportGenerator] = None,
+                 checkpoints: Optional[CheckpointStore] = None):
+        codes = list(dict.fromkeys(c.strip().lower() for c in country_codes if c.strip()))
+        if not codes:
+            raise ValueError("At least one country code is required.")
+        self.niche = niche
+        self.project_id = project_id or f"multi_{int(time.time())}_{uuid.uuid4().hex[:6]}"
+        self.architect = architect or ArchitectAgent()
+        self.reporter = reporter or ReportGenerator()
+        self.supervisors: Dict[str, SupervisorAgent] = {
+            code: SupervisorAgent(niche, country_code=code, project_id=f"{self.project_id}_{code}",
+                                  checkpoints=checkpoints, architect=_DeferredSpec(), reporter=self.reporter)
+            for code in codes
+        }
+
+        self.comparison: Optional[Dict] = None
+        self.product_spec: Optional[ProductSpec] = None
+        self.report_path: Optional[str] = None
+        self.progress = 0.0
+        self.message = "Queued..."
+        self.done = False
+        self.error: Optional[str] = None
+
+    @property
+    def states(self) -> List[ResearchState]:
+        return [s.state for s in self.supervisors.values()]
+
+    def start(self) -> "MultiMarketResearch":
+        """Runs on a background thread (for UIs that poll progress)."""
+        threading.Thread(target=self._run_in_thread, daemon=True).start()
+        return self
+
+    def run(self) -> Dict:
+        return asyncio.run(self.arun())
+
+    async def arun(self) -> Dict:
+        print(f"--- Multi-market research: '{self.niche}' in {', '.join(c.upper() for c in self.supervisors)} ---")
+        total, finished = len(self.supervisors), 0
+
+        async def run_market(code: str, supervisor: SupervisorAgent):
+            nonlocal finished
+            try:
+                await supervisor.arun()
+                if supervisor.state.current_stage == ResearchStage.HUNTING_REVIEW:
+                    supervisor.state.current_stage = ResearchStage.MINING  # auto-approve
+                    await supervisor.arun()
+            except Exception as e:
+                print(f"   [Markets] {code.upper()} failed: {e}")
+            finished += 1
+            self._update(0.9 * finished / total, f"{code.upper()} done ({finished}/{total} markets)")
+
+        await asyncio.gather(*(run_market(code, sup) for code, sup in self.supervisors.items()))
+
+        self._update(0.9, "Architect Agent is drafting the Blueprint...")
+        self.product_spec = await self._shared_spec()
+        if self.product_spec:
+            for state in self.states:
+                if state.current_stage == ResearchStage.COMPLETED:
+                    state.product_spec = self.product_spec
+                    await asyncio.to_thread(self.reporter.save_report, state)
+
+        self.comparison = compare_markets(self.niche, self.states)
+        self.report_path = await asyncio.to_thread(
+            self.reporter.save_comparison, self.project_id, self.comparison, self.product_spec)
+        print(f"✅ COMPARISON SAVED: {self.report_path}")
+        self._update(1.0, "Done.")
+        return self.comparison
+
+    async def _shared_spec(self) -> Optional[ProductSpec]:
+        """One spec for the best idea across every market."""
+        candidates = [s for s in self.supervisors.values() if s.state.final_ideas]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda s: s.state.final_ideas[0].opportunity_score)
+        state = best.state
+        print(f">> Markets: Best idea is in {state.country_code.upper()}. Calling 'The Architect' once...")
+        # Recorded on the winning market's trace
+        with use_tracer(best.tracer), best.tracer.span("stage.architecting", kind="stage", shared=True):
+            return await self.architect.acreate_spec(state.final_ideas[0], state.pain_points)
+
+    def _update(self, progress: float, message: str):
+        self.progress = max(self.progress, min(1.0, progress))
+        self.message = message
+
+    def _run_in_thread(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = str(e)
+            self.message = f"Failed: {e}"
+        finally:
+            self.done = True
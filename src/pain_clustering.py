@@ -0,0 +1,115 @@
+import re
+import hashlib
+import numpy as np
+from collections import Counter
+from typing import Dict, List
+from .state import PainPoint
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "with", "this", "that", "was", "its",
+    "have", "has", "they", "too", "very", "just", "can", "all", "any", "our", "from", "their",
+}
+
+def normalize_text(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 2 and t not in _STOPWORDS]
+
+class PainClusterer:
+    """Merges near-duplicate pains between mining and validation.
+
+    1. Exact duplicates (after normalization) collapse by hash.
+    2. A TF-IDF cosine pass (one NumPy matrix product) merges paraphrases.
+    3. Clusters sum `frequency`, average `sentiment_score` (frequency-weighted)
+       and are ranked by frequency x severity, most painful first.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.6):
+        self.similarity_threshold = similarity_threshold
+
+    def cluster(self, pains: List[PainPoint]) -> List[PainPoint]:
+        if not pains:
+            return []
+
+        # 1. Exact duplicates
+        groups: Dict[str, List[PainPoint]] = {}
+        for pain in pains:
+            digest = hashlib.sha1(normalize_text(pain.quote).encode("utf-8")).hexdigest()
+            groups.setdefault(digest, []).append(pain)
+        buckets = list(groups.values())
+
+        # 2. Near duplicates
+        labels = self._similarity_labels([b[0].quote for b in buckets])
+        clusters: Dict[int, List[PainPoint]] = {}
+        for bucket, label in zip(buckets, labels):
+            clusters.setdefault(label, []).extend(bucket)
+
+        merged = [self._merge(members) for members in clusters.values()]
+
+        # 3. Rank (sort is stable, so ties keep mining order)
+        merged.sort(key=lambda p: p.frequency * self.severity(p), reverse=True)
+        print(f"   [Clustering] {len(pains)} pains -> {len(merged)} distinct.")
+        return merged
+
+    @staticmethod
+    def severity(pain: PainPoint) -> float:
+        """Maps sentiment -1.0 (angry) .. 1.0 (happy) onto 1.0 .. 0.0."""
+        return (1.0 - max(-1.0, min(1.0, pain.sentiment_score))) / 2.0
+
+    def _similarity_labels(self, texts: List[str]) -> List[int]:
+        n = len(texts)
+        if n < 2:
+            return list(range(n))
+
+        docs = [_tokens(t) for t in texts]
+        vocab = {term: i for i, term in enumerate(sorted({t for d in docs for t in d}))}
+        if not vocab:
+            return list(range(n))
+
+        tf = np.zeros((n, len(vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for term, count in Counter(doc).items():
+                tf[row, vocab[term]] = count
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        tfidf = tf * idf
+        norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+        tfidf = tfidf / np.where(norms == 0, 1.0, norms)
+
+        sim = tfidf @ tfidf.T
+        pairs = np.argwhere(np.triu(sim >= self.similarity_threshold, k=1))
+
+        # Union-find over the similar pairs
+        parent = list(range(n))
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        for i, j in pairs:
+            ri, rj = find(int(i)), find(int(j))
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+        return [find(i) for i in range(n)]
+
+    def _merge(self, members: List[PainPoint]) -> PainPoint:
+        if len(members) == 1:
+            return members[0].model_copy()
+
+        total = sum(max(1, p.frequency) for p in members)
+        sentiment = sum(p.sentiment_score * max(1, p.frequency) for p in members) / total
+        # The most negative quote speaks for the cluster
+        representative = min(members, key=lambda p: p.sentiment_score)
+        category = Counter(p.pain_category for p in members).most_common(1)[0][0]
+        sources = list(dict.fromkeys(p.source for p in members))
+        competitors = list(dict.fromkeys(c for p in members for c in p.competitors))
+        return PainPoint(
+            source=", ".join(sources),
+            quote=representative.quote,
+            pain_category=category,
+            sentiment_score=round(sentiment, 3),
+            frequency=total,
+            competitors=competitors,
+        )
@@ -0,0 +1,110 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from .instrumentation import trace, CHARS_PER_TOKEN
+
+# Search-data budget per prompt, by the agent's model preference
+PROMPT_BUDGETS = {"flash": 3000, "pro": 2000}
+
+# SERP snippet noise that costs tokens but carries no signal
+_BOILERPLATE = [
+    re.compile(r"https?://\S+"),
+    re.compile(r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2}, \d{4}\s*[—–-]\s*"),
+    re.compile(r"\b\d+ (?:votes?|comments?|answers?|upvotes?)(?:, \d+ (?:votes?|comments?|answers?))?\.?", re.I),
+    re.compile(r"\b(?:Read|See|Show|View) (?:more|full review|all)\b\.*", re.I),
+    re.compile(r"\bMissing: .*?(?:Show results with: \S+|$)", re.I),
+    re.compile(r"(?:\.\.\.|…)"),
+]
+_SPACE_RE = re.compile(r"[ \t]+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def budget_for(prefer: str) -> int:
+    return PROMPT_BUDGETS.get(prefer, PROMPT_BUDGETS["flash"])
+
+def strip_boilerplate(text: str) -> str:
+    for pattern in _BOILERPLATE:
+        text = pattern.sub(" ", text)
+    lines = [_SPACE_RE.sub(" ", line).strip(" -|·") for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+class PromptBuilder:
+    """Packs snippets into one prompt section under a token budget.
+
+    1. Strips boilerplate (URLs, dates, vote counts, "Read more", ellipses).
+    2. Drops near-duplicates (token-set Jaccard >= dedup_threshold).
+    3. Keeps whole snippets by priority (higher first, then insertion order)
+       until the budget is spent; only a lone oversized snippet is cut, at a
+       word boundary.
+
+    `stats` reports what was removed and the estimated tokens saved.
+    """
+
+    def __init__(self, token_budget: int, dedup_threshold: float = 0.8, separator: str = "\n"):
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.separator = separator
+        self._items: List[Tuple[int, int, str, str]] = []  # (priority, order, label, text)
+        self.stats: Dict[str, int] = {}
+
+    def add(self, text: Optional[str], priority: int = 0, label: str = "") -> "PromptBuilder":
+        """`label` (e.g. "Source: Reddit | Content: ") is prepended when the snippet is kept."""
+        if text:
+            self._items.append((priority, len(self._items), label, str(text)))
+        return self
+
+    def build(self, name: str = "prompt") -> str:
+        raw_tokens = estimate_tokens(self.separator.join(label + text for _, _, label, text in self._items))
+        kept: List[Tuple[int, str]] = []
+        kept_tokens: List[set] = []
+        used = duplicates = over_budget = 0
+
+        for priority, order, label, text in sorted(self._items, key=lambda i: (-i[0], i[1])):
+            clean = strip_boilerplate(text)
+            if not clean:
+                continue
+            tokens = set(_TOKEN_RE.findall(clean.lower()))
+            if any(self._similar(tokens, other) for other in kept_tokens):
+                duplicates += 1
+                continue
+
+            entry = label + clean
+            cost = estimate_tokens(entry) + (estimate_tokens(self.separator) if kept else 0)
+            if used + cost > self.token_budget:
+                if kept:
+                    over_budget += 1
+                    continue
+                entry = self._cut(entry, self.token_budget)
+                cost = estimate_tokens(entry)
+            kept.append((order, entry))
+            kept_tokens.append(tokens)
+            used += cost
+
+        text = self.separator.join(entry for _, entry in sorted(kept))
+        out_tokens = estimate_tokens(text)
+        self.stats = {
+            "snippets_in": len(self._items),
+            "snippets_out": len(kept),
+            "duplicates": duplicates,
+            "over_budget": over_budget,
+            "tokens_in": raw_tokens,
+            "tokens_out": out_tokens,
+            "tokens_saved": max(0, raw_tokens - out_tokens),
+        }
+        with trace(f"prompt.{name}", kind="prompt", **self.stats):
+            pass
+        return text
+
+    def _similar(self, a: set, b: set) -> bool:
+        if not a or not b:
+            return a == b
+        return len(a & b) / len(a | b) >= self.dedup_threshold
+
+    @staticmethod
+    def _cut(text: str, token_budget: int) -> str:
+        limit = token_budget * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        cut = text[:limit]
+        return cut[:cut.rfind(" ")] if " " in cut else cut
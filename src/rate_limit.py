@@ -0,0 +1,52 @@
+import time
+import threading
+from typing import Dict
+
+class TokenBucket:
+    """Thread-safe token bucket. `rate` tokens/second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# Shared limiters, one per upstream (e.g. "serpapi", "gemini:models/gemini-1.5-flash").
+# Names of the form "<upstream>:<detail>" get the upstream's default rate.
+DEFAULT_RATES = {
+    "serpapi": (5.0, 5.0),
+    "gemini": (1.0, 2.0),
+}
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name: str) -> TokenBucket:
+    with _limiters_lock:
+        if name not in _limiters:
+            rate, capacity = DEFAULT_RATES.get(name.split(":")[0], (1.0, 1.0))
+            _limiters[name] = TokenBucket(rate, capacity)
+        return _limiters[name]
+
+def configure_limiter(name: str, rate: float, capacity: float = 1.0) -> TokenBucket:
+    """Replace the shared limiter for `name` (e.g. for a paid quota tier)."""
+    with _limiters_lock:
+        _limiters[name] = TokenBucket(rate, capacity)
+        return _limiters[name]
@@ -1,46 +1,138 @@
 import os
+import csv
+import json
 import time
-from .state import ResearchState
+import shutil
+import threading
+from typing import Dict, List
+from .state import ResearchState, ProductSpec
+
+# Sections in report order; each is appended as soon as its stage completes
+SECTIONS = ("competitors", "pains", "ideas", "spec")
+
+# One JSON line per finished report, so tooling never has to parse Markdown
+INDEX_FILE = "index.jsonl"
+_index_lock = threading.Lock()
+
+IDEA_COLUMNS = ["rank", "target_keyword", "opportunity_score", "search_volume", "difficulty", "cpc", "description"]
+PAIN_COLUMNS = ["pain_category", "quote", "frequency", "sentiment_score", "source", "competitors"]
+
+SUMMARY_PENDING = "*Research in progress. Sections below are added as each stage completes.*"
 
 class ReportGenerator:
+    """Streams a Markdown report to disk section by section.
+
+    start_report() writes the header, append_section() adds one section and
+    finish_report() fills in the executive summary and exports JSON and CSV
+    next to it. Every write goes to a temp file that replaces the target
+    atomically, so a crash mid-run leaves the sections finished so far, never
+    a half-written file. Files are named after the project id, so reruns of
+    the same niche never collide.
+    """
+
     def __init__(self, output_dir="reports"):
         self.output_dir = output_dir
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
     def save_report(self, state: ResearchState) -> str:
-        """Generates a Markdown report and saves it. Returns the filename."""
-        
-        # 1. Build the Content
-        content = self._build_markdown(state)
-        
-        # 2. Generate Filename (Sanitized)
-        safe_niche = "".join(c for c in state.niche if c.isalnum() or c in (' ', '_')).rstrip()
-        safe_niche = safe_niche.replace(" ", "_").lower()
-        timestamp = time.strftime("%Y%m%d-%H%M")
-        filename = f"{self.output_dir}/{timestamp}_{safe_niche}.md"
-        
-        # 3. Write File
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(content)
-            
+        """Generates the whole Markdown report in one go. Returns the filename."""
+        filename = self.start_report(state)
+        for section in SECTIONS:
+            self.append_section(filename, state, section)
+        self.finish_report(filename, state)
         return filename
 
-    def _build_markdown(self, state: ResearchState) -> str:
+    def paths_for(self, state: ResearchState) -> Dict[str, str]:
+        """Every file a project's report consists of, keyed by format."""
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in state.project_id)
+        base = os.path.join(self.output_dir, safe_id)
+        return {
+            "markdown": f"{base}.md",
+            "json": f"{base}.json",
+            "ideas_csv": f"{base}.ideas.csv",
+            "pains_csv": f"{base}.pains.csv",
+            "spans": f"{base}.spans.jsonl",
+        }
+
+    def start_report(self, state: ResearchState) -> str:
+        """Writes the header and returns the filename later sections go to."""
+        filename = self.paths_for(state)["markdown"]
+
         md = []
         md.append(f"# 🕵️ MicroSaaS Validation Report: {state.niche}")
         md.append(f"**Date:** {time.strftime('%Y-%m-%d %H:%M')} | **Region:** {state.country_code.upper()}\n")
-        
         md.append("## 1. Executive Summary")
+        md.append(SUMMARY_PENDING)
+        md.append("---\n")
+        self._write(filename, "\n".join(md) + "\n", append=False)
+        return filename
+
+    def append_section(self, filename: str, state: ResearchState, section: str):
+        builder = getattr(self, f"_section_{section}")
+        self._write(filename, "\n".join(builder(state)) + "\n", append=True)
+
+    def finish_report(self, filename: str, state: ResearchState):
+        """Replaces the pending summary with the result and closes the report."""
         top_idea = state.final_ideas[0] if state.final_ideas else None
         if top_idea:
-            md.append(f"**Top Opportunity:** {top_idea.description}")
-            md.append(f"**Potential:** {top_idea.opportunity_score}/10")
+            summary = f"**Top Opportunity:** {top_idea.description}\n**Potential:** {top_idea.opportunity_score}/10"
         else:
-            md.append("No high-confidence opportunities found.")
-        md.append("---\n")
+            summary = "No high-confidence opportunities found."
+        footer = "\n---\n*Generated by MicroSaaS Agent Swarm*\n"
+        self._write(filename, footer, append=True, replace={SUMMARY_PENDING: summary})
+        self.export(state)
+
+    # --- Machine-readable exports ---
 
-        md.append("## 2. Market Landscape (Competitors)")
+    def export(self, state: ResearchState) -> Dict[str, str]:
+        """Writes the JSON and CSV exports and records the report in the index."""
+        paths = self.paths_for(state)
+        data = state.model_dump(mode="json", exclude={"spans"})
+        data["generated_at"] = time.time()
+        self._replace(paths["json"], lambda f: json.dump(data, f, indent=2, ensure_ascii=False))
+
+        def write_ideas(f):
+            writer = csv.DictWriter(f, fieldnames=IDEA_COLUMNS)
+            writer.writeheader()
+            for rank, idea in enumerate(state.final_ideas, start=1):
+                writer.writerow({"rank": rank, **idea.model_dump(include=set(IDEA_COLUMNS))})
+
+        def write_pains(f):
+            writer = csv.DictWriter(f, fieldnames=PAIN_COLUMNS)
+            writer.writeheader()
+            for p in state.pain_points:
+                row = p.model_dump(include=set(PAIN_COLUMNS))
+                row["competitors"] = "; ".join(p.competitors)
+                writer.writerow(row)
+
+        self._replace(paths["ideas_csv"], write_ideas)
+        self._replace(paths["pains_csv"], write_pains)
+        self._append_index(state, paths)
+        return paths
+
+    def _append_index(self, state: ResearchState, paths: Dict[str, str]):
+        top = state.final_ideas[0] if state.final_ideas else None
+        entry = {
+            "project_id": state.project_id,
+            "niche": state.niche,
+            "country_code": state.country_code,
+            "stage": state.current_stage.value,
+            "finished_at": time.time(),
+            "competitors": len(state.competitors),
+            "pain_points": len(state.pain_points),
+            "ideas": len(state.final_ideas),
+            "top_keyword": top.target_keyword if top else None,
+            "top_score": top.opportunity_score if top else None,
+            "files": {k: v for k, v in paths.items() if k != "spans"},
+        }
+        with _index_lock, open(os.path.join(self.output_dir, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    # --- Sections ---
+
+    def _section_competitors(self, state: ResearchState) -> list:
+        md = ["## 2. Market Landscape (Competitors)"]
         if state.competitors:
             for comp in state.competitors:
                 status = "✅ Relevant" if comp.is_relevant else "❌ Ignored"
@@ -49,8 +141,10 @@ class ReportGenerator:
         else:
             md.append("*No competitors analyzed.*")
         md.append("\n")
+        return md
 
-        md.append("## 3. The Pain (Voice of Customer)")
+    def _section_pains(self, state: ResearchState) -> list:
+        md = ["## 3. The Pain (Voice of Customer)"]
         if state.pain_points:
             md.append("| Category | Quote | Frequency |")
             md.append("| :--- | :--- | :--- |")
@@ -60,38 +154,128 @@ class ReportGenerator:
         else:
             md.append("*No significant pain points extracted.*")
         md.append("\n")
+        return md
+
+    def _section_ideas(self, state: ResearchState) -> list:
+        md = ["## 4. Validated Opportunities"]
+        if state.final_ideas:
+            md.append("| Target Keyword | Vol (Est.) | Score | Idea |")
+            md.append("| :--- | :--- | :--- | :--- |")
+            for idea in state.final_ideas:
+                md.append(f"| `{idea.target_keyword}` | {idea.search_volume} | **{idea.opportunity_score}** | {idea.description} |")
+        else:
+            md.append("*No validated ideas generated.*")
+        return md
 
-        md.append("## 4. Validated Opportunities")
-        if state.product_spec:
-            spec = state.product_spec
-            md.append("\n## 5. 🏗️ The Architect's Blueprint (MVP Spec)")
+    def _section_spec(self, state: ResearchState) -> list:
+        return self._spec_lines(state.product_spec, "5.")
+
+    def _spec_lines(self, spec: ProductSpec, number: str) -> list:
+        md = []
+        if spec:
+            md.append(f"\n## {number} 🏗️ The Architect's Blueprint (MVP Spec)")
             md.append(f"### **Project Name:** {spec.mvp_name}")
             md.append(f"> *{spec.tagline}*")
-            
+
             md.append("\n**marketing Hook (Hero Text):**")
             md.append(f"`{spec.marketing_hook}`")
-            
+
             md.append("\n**Core Features (MVP):**")
             for feat in spec.core_features:
                 md.append(f"- [ ] {feat}")
-                
+
             md.append("\n**Recommended Stack:**")
             md.append(f"`{' | '.join(spec.tech_stack_recommendation)}`")
-            
+
             md.append("\n**User Stories:**")
             for story in spec.user_stories:
                 md.append(f"- {story}")
-        # -----------------------------------------------
+        return md
 
-        md.append("\n---\n*Generated by MicroSaaS Agent Swarm*")
-        return "\n".join(md)
-        if state.final_ideas:
-            md.append("| Target Keyword | Vol (Est.) | Score | Idea |")
-            md.append("| :--- | :--- | :--- | :--- |")
-            for idea in state.final_ideas:
-                md.append(f"| `{idea.target_keyword}` | {idea.search_volume} | **{idea.opportunity_score}** | {idea.description} |")
+    # --- Multi-market comparison ---
+
+    def save_comparison(self, project_id: str, comparison: Dict, spec: ProductSpec = None) -> str:
+        """Writes <project_id>.comparison.md and .json. Returns the Markdown filename."""
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        base = os.path.join(self.output_dir, f"{safe_id}.comparison")
+        codes = [m["country_code"] for m in comparison["markets"]]
+
+        md = []
+        md.append(f"# 🌍 Multi-Market Comparison: {comparison['niche']}")
+        md.append(f"**Date:** {time.strftime('%Y-%m-%d %H:%M')} | **Markets:** {', '.join(c.upper() for c in codes)}\n")
+        if comparison["best_market"]:
+            md.append(f"**Strongest Market:** {comparison['best_market'].upper()}\n")
+
+        md.append("## 1. Demand by Market")
+        md.append("| Market | Competitors | Pains | Top Keyword | Top Score | Mean Score | Status |")
+        md.append("| :--- | :--- | :--- | :--- | :--- | :--- | :--- |")
+        for m in comparison["markets"]:
+            keyword = f"`{m['top_keyword']}`" if m["top_keyword"] else "-"
+            md.append(f"| {m['country_code'].upper()} | {len(m['competitors'])} | {m['pain_points']} | {keyword} | "
+                      f"{m['top_score'] if m['top_score'] is not None else '-'} | "
+                      f"{m['mean_score'] if m['mean_score'] is not None else '-'} | {m['status']} |")
+
+        md.append("\n## 2. Competitor Presence")
+        if comparison["competitors"]:
+            md.append("| Competitor | " + " | ".join(c.upper() for c in codes) + " |")
+            md.append("| :--- |" + " :---: |" * len(codes))
+            for entry in comparison["competitors"].values():
+                cells = ["✅" if c in entry["markets"] else "-" for c in codes]
+                md.append(f"| {entry['name']} | " + " | ".join(cells) + " |")
         else:
-            md.append("*No validated ideas generated.*")
-            
+            md.append("*No competitors analyzed.*")
+
+        md.extend(self._spec_lines(spec, "3."))
         md.append("\n---\n*Generated by MicroSaaS Agent Swarm*")
-        return "\n".join(md)
\ No newline at end of file
+
+        filename = f"{base}.md"
+        self._write(filename, "\n".join(md) + "\n", append=False)
+        data = {**comparison, "product_spec": spec.model_dump() if spec else None, "generated_at": time.time()}
+        self._replace(f"{base}.json", lambda f: json.dump(data, f, indent=2, ensure_ascii=False))
+        return filename
+
+    # --- Atomic writes ---
+
+    @staticmethod
+    def _tmp_path(path: str) -> str:
+        # Unique per writer, so two jobs writing the same report never share a temp file
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _replace(self, path: str, write):
+        tmp_path = self._tmp_path(path)
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def _write(self, filename: str, text: str, append: bool, replace: dict = None):
+        """Streams the existing report (line by line, applying `replace`) plus
+        `text` into a temp file, then swaps it in with os.replace."""
+        tmp_path = self._tmp_path(filename)
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            if append and os.path.exists(filename):
+                with open(filename, "r", encoding="utf-8") as src:
+                    if replace:
+                        for line in src:
+                            key = line.rstrip("\n")
+                            out.write(replace[key] + "\n" if key in replace else line)
+                    else:
+                        shutil.copyfileobj(src, out)
+            out.write(text)
+        os.replace(tmp_path, filename)
+
+
+def load_index(output_dir: str = "reports") -> List[dict]:
+    """Index entries, latest per project (a resumed project is indexed again)."""
+    latest: Dict[str, dict] = {}
+    try:
+        with open(os.path.join(output_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn line from a crash mid-append
+                latest.pop(entry["project_id"], None)
+                latest[entry["project_id"]] = entry
+    except OSError:
+        return []
+    return list(latest.values())
@@ -0,0 +1,130 @@
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+from .state import ResearchState, ResearchStage
+from .pain_clustering import PainClusterer
+from .knowledge_store import get_knowledge_store
+from .instrumentation import Tracer, use_tracer
+
+class ResearchJob:
+    """Runs the heavy phase (mine -> cluster -> validate -> architect -> report) on a
+    background thread and exposes progress for a UI to poll.
+
+    Works on a deep copy of the state, so the caller's state is never mutated
+    while the job is running.
+    """
+
+    # Share of the progress bar each step gets
+    MINING_SHARE = 0.7
+    VALIDATING_SHARE = 0.2
+
+    def __init__(self, state: ResearchState, miner, validator, architect, reporter):
+        self.state = state.model_copy(deep=True)
+        self.miner = miner
+        self.validator = validator
+        self.architect = architect
+        self.reporter = reporter
+
+        self.progress = 0.0
+        self.message = "Queued..."
+        self.done = False
+        self.error: Optional[str] = None
+        self.report_path: Optional[str] = None
+        self.tracer = Tracer(self.state)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "ResearchJob":
+        self._thread.start()
+        return self
+
+    def _update(self, progress: float, message: str):
+        self.progress = max(self.progress, min(1.0, progress))
+        self.message = message
+
+    @contextmanager
+    def _stage_span(self, stage: str):
+        # Threads don't inherit contextvars, so activate the tracer here
+        with use_tracer(self.tracer), self.tracer.span(f"stage.{stage}", kind="stage") as attrs:
+            yield attrs
+
+    def _run(self):
+        try:
+            # Sections stream to disk as each step finishes
+            self.report_path = self.reporter.start_report(self.state)
+            self.reporter.append_section(self.report_path, self.state, "competitors")
+
+            # 1. MINER
+            self._update(0.0, "Miner Agent is extracting pains...")
+            with self._stage_span("mining"):
+                pains = self.miner.mine(
+                    self.state.competitors,
+                    on_progress=lambda f, msg: self._update(f * self.MINING_SHARE, f"Miner: {msg}"),
+                )
+                pains = PainClusterer().cluster(pains)
+            self.state.pain_points = pains
+            self.reporter.append_section(self.report_path, self.state, "pains")
+
+            # 2. VALIDATOR
+            self._update(self.MINING_SHARE, "Validator Agent is scoring demand...")
+            with self._stage_span("validating"):
+                ideas = self.validator.validate(pains)
+            self.state.final_ideas = ideas
+            self.reporter.append_section(self.report_path, self.state, "ideas")
+
+            # 3. ARCHITECT
+            self._update(self.MINING_SHARE + self.VALIDATING_SHARE, "Architect Agent is drafting the Blueprint...")
+            if ideas:
+                # We pick the top idea to architect
+                with self._stage_span("architecting"):
+                    self.state.product_spec = self.architect.create_spec(ideas[0], pains)
+
+            self.state.current_stage = ResearchStage.COMPLETED
+            self.reporter.append_section(self.report_path, self.state, "spec")
+            self.reporter.finish_report(self.report_path, self.state)
+            get_knowledge_store().save_state(self.state)
+            self._update(1.0, "Done.")
+        except Exception as e:
+            self.error = str(e)
+            self.message = f"Failed: {e}"
+        finally:
+            self.done = True
+
+
+class JobRegistry:
+    """Process-wide jobs keyed by their inputs, so sessions asking for the same
+    (niche, country, competitors) share one run and its finished result."""
+
+    def __init__(self, max_finished: int = 32):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[Hashable, ResearchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_start(self, key: Hashable, factory: Callable[[], ResearchJob]) -> ResearchJob:
+        """The job for `key`, starting one if there is none. A failed job is
+        returned as is (so its error can be shown); see retry()."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = factory().start()
+                self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._trim()
+            return job
+
+    def retry(self, key: Hashable, factory: Callable[[], ResearchJob]) -> ResearchJob:
+        """Replaces a failed job with a fresh run (on explicit user request).
+        A job that is running or succeeded is left alone, so sessions that
+        press Retry together start one run."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.error:
+                job = factory().start()
+                self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            return job
+
+    def _trim(self):
+        finished = [k for k, j in self._jobs.items() if j.done]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
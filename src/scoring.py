@@ -0,0 +1,49 @@
+import numpy as np
+from pydantic import BaseModel
+from typing import Sequence
+
+class ScoringWeights(BaseModel):
+    demand: float = 0.45          # search results in the "sweet spot"
+    pain_frequency: float = 0.20  # how many people complained
+    severity: float = 0.15        # how angry they were
+    competition: float = 0.20     # fewer advertisers on the keyword = easier
+
+    # Demand peaks around 10^4.5 results: big enough to matter, small enough
+    # not to be owned by incumbents (the old ladder's 10k-100k = 9.0 band)
+    demand_center_log10: float = 4.5
+    demand_width_log10: float = 1.5
+
+class OpportunityScorer:
+    """Scores any number of candidate ideas in one vectorized pass (0-10 scale)."""
+
+    def __init__(self, weights: ScoringWeights = None):
+        self.weights = weights or ScoringWeights()
+
+    def score(self, total_results: Sequence[float], frequency: Sequence[float],
+              sentiment: Sequence[float], competitor_density: Sequence[float]) -> np.ndarray:
+        w = self.weights
+        results = np.asarray(total_results, dtype=np.float64)
+        freq = np.asarray(frequency, dtype=np.float64)
+        sent = np.clip(np.asarray(sentiment, dtype=np.float64), -1.0, 1.0)
+        density = np.maximum(np.asarray(competitor_density, dtype=np.float64), 0.0)
+
+        log_results = np.log10(results + 1.0)
+        demand = np.exp(-((log_results - w.demand_center_log10) ** 2) / (2 * w.demand_width_log10 ** 2))
+        demand = np.where(results > 0, demand, 0.0)
+        pain = 1.0 - np.exp(-np.maximum(freq, 0.0) / 3.0)
+        severity = (1.0 - sent) / 2.0
+        competition = self.competition(density)
+
+        total_weight = w.demand + w.pain_frequency + w.severity + w.competition
+        combined = (w.demand * demand + w.pain_frequency * pain
+                    + w.severity * severity + w.competition * competition) / total_weight
+        return np.round(10.0 * combined, 1)
+
+    @staticmethod
+    def competition(competitor_density) -> np.ndarray:
+        """1.0 = nobody advertising, trending to 0.0 as the SERP fills up."""
+        return 1.0 / (1.0 + np.maximum(np.asarray(competitor_density, dtype=np.float64), 0.0) / 4.0)
+
+    def rank(self, scores: Sequence[float]) -> np.ndarray:
+        """Indices that sort `scores` best-first (stable for ties)."""
+        return np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
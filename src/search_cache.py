@@ -0,0 +1,88 @@
+import threading
+from serpapi import GoogleSearch
+from typing import Callable, Optional
+from .cache import DiskCache, content_key
+from .rate_limit import get_limiter
+from .single_flight import SingleFlight
+from .instrumentation import trace
+
+# How long a SERP stays fresh, per kind of query
+SEARCH_TTLS = {
+    "hunt": 7 * 24 * 3600,      # competitor lists move slowly
+    "reddit": 3 * 24 * 3600,
+    "reviews": 3 * 24 * 3600,
+    "metrics": 24 * 3600,       # demand checks
+    "default": 24 * 3600,
+}
+
+class SearchCache(DiskCache):
+    """Persistent cache of SerpApi responses keyed on the normalized query."""
+
+    def __init__(self, directory: str = ".cache/serpapi", max_bytes: int = 100 * 1024 * 1024):
+        super().__init__(directory, max_bytes=max_bytes, default_ttl=SEARCH_TTLS["default"])
+
+    @staticmethod
+    def key_for(params: dict) -> str:
+        # api_key never affects the result, so it never enters the key
+        normalized = {k: v for k, v in params.items() if k != "api_key"}
+        normalized["engine"] = str(normalized.get("engine", "google")).lower()
+        normalized["q"] = " ".join(str(normalized.get("q", "")).lower().split())
+        if "gl" in normalized:
+            normalized["gl"] = str(normalized["gl"]).lower()
+        if "num" in normalized:
+            normalized["num"] = int(normalized["num"])
+        return content_key(normalized)
+
+
+def _google_search(params: dict, query_type: str = "default") -> dict:
+    return GoogleSearch(params).get_dict()
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+_flights = SingleFlight()
+_backend: Callable[[dict, str], dict] = _google_search
+
+def set_search_backend(backend: Optional[Callable[[dict, str], dict]] = None):
+    """Swaps the transport behind cached_search (e.g. a replay stand-in for
+    offline benchmarks); it is called as backend(params, query_type). None
+    restores the live SerpApi client."""
+    global _backend
+    _backend = backend or _google_search
+
+def coalesced_searches() -> int:
+    """How many searches were served by joining an identical in-flight call."""
+    return _flights.shared
+
+def get_search_cache() -> SearchCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache()
+    return _cache
+
+def cached_search(params: dict, query_type: str = "default", use_cache: bool = True) -> dict:
+    """Drop-in for GoogleSearch(params).get_dict() backed by the shared cache.
+
+    Errors from GoogleSearch propagate unchanged; error payloads are never cached.
+    """
+    with trace("serpapi.search", kind="search", query_type=query_type, q=params.get("q")) as span:
+        cache = get_search_cache()
+        key = cache.key_for(params)
+        if use_cache:
+            hit = cache.get(key, ttl=SEARCH_TTLS.get(query_type, SEARCH_TTLS["default"]))
+            if hit is not None:
+                span.update(cache_hit=True, serpapi_queries=0)
+                return hit
+
+        def fetch() -> dict:
+            span["wait_s"] = round(get_limiter("serpapi").acquire(), 3)
+            span["serpapi_queries"] = 1
+            results = _backend(params, query_type)
+            if use_cache and "error" not in results:
+                cache.set(key, results)
+            return results
+
+        # Identical queries already in flight (other jobs/sessions) share one call
+        span.update(cache_hit=False, serpapi_queries=0)
+        return _flights.do(key, fetch)
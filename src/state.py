@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from pydantic import BaseModel, Field
 from enum import Enum
 
@@ -18,6 +18,7 @@ class Competitor(BaseModel):
     url: str
     pricing_page: Optional[str] = None
     is_relevant: bool = True  # User can toggle this to False
+    canonical_id: Optional[str] = None  # Same product under any spelling (see entity_resolution)
 
 class PainPoint(BaseModel):
     source: str  # e.g., "Reddit", "G2"
@@ -25,6 +26,7 @@ class PainPoint(BaseModel):
     pain_category: str  # e.g., "Pricing", "UX", "Missing Feature"
     sentiment_score: float  # -1.0 to 1.0
     frequency: int = 1
+    competitors: List[str] = Field(default_factory=list)  # Who it was mined from
 
 class ValidatedIdea(BaseModel):
     description: str
@@ -44,6 +46,13 @@ class ProductSpec(BaseModel):
     user_stories: List[str]
     marketing_hook: str
 
+class Span(BaseModel):
+    name: str  # e.g. "stage.mining", "llm.generate", "serpapi.search"
+    kind: str  # "stage" | "llm" | "search"
+    started_at: float
+    duration_ms: float
+    attributes: Dict[str, Any] = Field(default_factory=dict)  # model, retries, chars, cache_hit...
+
 class ResearchState(BaseModel):
     # Inputs
     project_id: str
@@ -53,6 +62,7 @@ class ResearchState(BaseModel):
     # Flow Control
     current_stage: ResearchStage = ResearchStage.INIT
     logs: List[str] = Field(default_factory=list) # Audit trail of agent actions
+    spans: List[Span] = Field(default_factory=list) # Timings and cost of every stage and external call
     
     # Data Accumulation
     competitors: List[Competitor] = Field(default_factory=list)
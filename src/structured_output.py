@@ -0,0 +1,145 @@
+import re
+import json
+from typing import Any, Dict, Iterator, Optional, Type, Union
+from pydantic import BaseModel
+
+# Keys of the OpenAPI subset Gemini's response_schema accepts
+_SCHEMA_KEYS = ("type", "format", "description", "nullable", "enum", "items", "properties", "required")
+_FENCE_RE = re.compile(r"```(?:json)?", re.I)
+_CLOSERS = {"[": "]", "{": "}"}
+_MAX_REPAIRS = 50
+_MAX_STARTS = 20
+
+SchemaSource = Union[Type[BaseModel], Dict[str, Any]]
+
+def gemini_schema(source: SchemaSource, exclude: Optional[set] = None) -> Dict[str, Any]:
+    """Converts a Pydantic model (or a JSON schema dict) to a Gemini response_schema:
+    $refs inlined, Optional[X] -> nullable X, titles/defaults dropped.
+    `exclude` drops top-level fields the model should not fill in."""
+    schema = source.model_json_schema() if isinstance(source, type) else source
+    out = _convert(schema, schema.get("$defs", {}))
+    if exclude and "properties" in out:
+        out["properties"] = {k: v for k, v in out["properties"].items() if k not in exclude}
+        out["required"] = [k for k in out.get("required", []) if k not in exclude]
+    return out
+
+def array_of(item: SchemaSource, exclude: Optional[set] = None) -> Dict[str, Any]:
+    return {"type": "ARRAY", "items": gemini_schema(item, exclude)}
+
+def object_of(fields: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """An object with exactly these (already converted) fields, all required."""
+    return {"type": "OBJECT", "properties": dict(fields), "required": list(fields)}
+
+STRING_LIST = {"type": "ARRAY", "items": {"type": "STRING"}}
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    for union in ("anyOf", "oneOf"):
+        if union in node:
+            options = [o for o in node[union] if o.get("type") != "null"]
+            # Gemini has no unions: keep the first real option
+            out = _convert(options[0], defs) if options else {"type": "STRING"}
+            if len(options) < len(node[union]):
+                out["nullable"] = True
+            if node.get("description"):
+                out["description"] = node["description"]
+            return out
+
+    out: Dict[str, Any] = {}
+    if "type" in node:
+        out["type"] = str(node["type"]).upper()
+    if "const" in node:
+        out.update(type="STRING", enum=[str(node["const"])])
+    if "enum" in node:
+        out.update(type="STRING", enum=[str(v) for v in node["enum"]])
+    if node.get("description"):
+        out["description"] = node["description"]
+    if out.get("type") == "OBJECT":
+        props = node.get("properties", {})
+        out["properties"] = {k: _convert(v, defs) for k, v in props.items()}
+        out["required"] = [k for k in node.get("required", []) if k in props]
+    elif out.get("type") == "ARRAY":
+        out["items"] = _convert(node.get("items", {"type": "string"}), defs)
+    return {k: out[k] for k in _SCHEMA_KEYS if k in out}
+
+def expected_type(schema: Optional[Dict[str, Any]]) -> Optional[type]:
+    """The Python type a reply to this (converted) schema must parse to."""
+    return {"ARRAY": list, "OBJECT": dict}.get((schema or {}).get("type", "").upper())
+
+def parse_json_text(text: str, expect: Optional[type] = None) -> Any:
+    """Parses the model's JSON, tolerating Markdown fences, prose before or
+    after it (brackets in the prose included) and output cut off mid-array.
+
+    Every top-level value in the reply is a candidate; one of type `expect`
+    wins over others, then the longest. Raises ValueError only when no value
+    can be recovered."""
+    cleaned = _FENCE_RE.sub("", text).strip()
+    try:
+        return json.loads(cleaned)
+    except ValueError:
+        pass
+
+    decoder = json.JSONDecoder()
+    found = []  # (length, value)
+    pos = attempts = 0
+    for start, ch in enumerate(cleaned):
+        if start < pos or ch not in _CLOSERS:
+            continue
+        attempts += 1
+        if attempts > _MAX_STARTS:
+            break
+        try:
+            value, pos = decoder.raw_decode(cleaned, start)
+            found.append((pos - start, value))
+            continue
+        except ValueError:
+            pass
+        value = _repair_truncated(cleaned[start:])
+        if value is not None:
+            found.append((len(cleaned) - start, value))
+            break  # a cut-off value runs to the end of the reply
+
+    if not found:
+        raise ValueError("No JSON value in response" if not attempts else "Unrepairable JSON in response")
+    matching = [f for f in found if expect is None or isinstance(f[1], expect)] or found
+    return max(matching, key=lambda f: f[0])[1]
+
+def _repair_truncated(body: str) -> Any:
+    for attempt, candidate in enumerate(_truncation_repairs(body)):
+        if attempt >= _MAX_REPAIRS:
+            break
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+def _truncation_repairs(body: str) -> Iterator[str]:
+    """Cuts `body` back to each point where a value just ended (a comma or a
+    closing bracket) and closes whatever is still open; latest cut first."""
+    stack, cuts = [], []
+    in_string = escaped = False
+    for i, ch in enumerate(body):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "]}":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((i + 1, "".join(reversed(stack))))
+            if not stack:
+                break
+        elif ch == ",":
+            cuts.append((i, "".join(reversed(stack))))
+    for end, closing in reversed(cuts):
+        yield body[:end] + closing
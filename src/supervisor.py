@@ -1,80 +1,113 @@
 import time
 import os
+import uuid
+import asyncio
+from contextlib import contextmanager
+from typing import Optional
 from .state import ResearchState, ResearchStage, Competitor
 from .agents.hunter import HunterAgent
 from .agents.miner import MinerAgent
 from .agents.validator import ValidatorAgent
-from .report_generator import ReportGenerator
+from .agents.architect import ArchitectAgent
+from .pain_clustering import PainClusterer
+from .report_generator import ReportGenerator, SECTIONS
+from .checkpoint import CheckpointStore
+from .search_cache import get_search_cache, coalesced_searches
+from .llm_client import get_llm_client
+from .knowledge_store import get_knowledge_store
+from .instrumentation import Tracer, use_tracer, export_spans_jsonl
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class SupervisorAgent:
-    def __init__(self, niche: str, country_code: str = "in"):
+    def __init__(self, niche: str, country_code: str = "in", project_id: Optional[str] = None,
+                 checkpoints: Optional[CheckpointStore] = None, architect: Optional[ArchitectAgent] = None,
+                 reporter: Optional[ReportGenerator] = None):
         # Initialize the State
         self.state = ResearchState(
-            project_id=f"proj_{int(time.time())}",
+            # Suffix keeps ids unique when batch jobs start in the same second
+            project_id=project_id or f"proj_{int(time.time())}_{uuid.uuid4().hex[:6]}",
             niche=niche,
             country_code=country_code
         )
-        
+
+        # Snapshot the state after every stage transition
+        self.checkpoints = checkpoints or CheckpointStore()
+        self._saved_stage = None
+        self.tracer = Tracer(self.state)
+
         # Initialize Hunter with your Key
         # Ensure you have your key here or in environment variables
         api_key = os.getenv("SERPAPI_KEY")
         self.hunter = HunterAgent(api_key=api_key, country_code=country_code)
         self.miner = MinerAgent(country_code=country_code)
         self.validator = ValidatorAgent(country_code=country_code)
-        self.reporter = ReportGenerator()
-        
+        # Injectable so several markets can share one architect/reporter
+        self.architect = architect or ArchitectAgent()
+        self.clusterer = PainClusterer()
+        self.reporter = reporter or ReportGenerator()
+        self.report_path = None
+        self._report_sections = set()
+
         print(f"--- Supervisor Initialized for Niche: {niche} in ({country_code.upper()}) ---")
 
+    @classmethod
+    def resume(cls, project_id: str, checkpoints: Optional[CheckpointStore] = None) -> Optional["SupervisorAgent"]:
+        """Rebuilds a supervisor from its last checkpoint; run() continues from
+        the saved current_stage. Returns None if there is no checkpoint."""
+        checkpoints = checkpoints or CheckpointStore()
+        state = checkpoints.load(project_id)
+        if state is None:
+            return None
+
+        supervisor = cls(niche=state.niche, country_code=state.country_code,
+                         project_id=project_id, checkpoints=checkpoints)
+        supervisor.state = state
+        supervisor.tracer = Tracer(state)
+        supervisor._saved_stage = state.current_stage
+        state.add_log(f"Resumed from checkpoint at stage {state.current_stage.value}.")
+        print(f">> Supervisor: Resuming {project_id} at {state.current_stage.value.upper()}.")
+        return supervisor
+
     def run(self):
         """The Main Event Loop"""
         while self.state.current_stage != ResearchStage.COMPLETED:
-            
+            self._save_checkpoint()
+
             # 1. INIT -> HUNTING
             if self.state.current_stage == ResearchStage.INIT:
-                self.state.add_log("Starting Research. Transitioning to HUNTING.")
-                self.state.current_stage = ResearchStage.HUNTING
-            
+                self._start()
+
             # 2. HUNTING (The Real Call)
             elif self.state.current_stage == ResearchStage.HUNTING:
                 print(">> Supervisor: Dispatching Hunter Agent...")
-                
+
                 try:
                     # Call the real Hunter Agent
-                    results = self.hunter.hunt(self.state.niche)
-                    self.state.competitors = results
-                    self.state.add_log(f"Hunter found {len(results)} competitors.")
+                    with self._stage_span():
+                        results = self.hunter.hunt(self.state.niche)
                 except Exception as e:
                     print(f"Error during Hunting: {e}")
                     # If hunting fails, we can't proceed. You might want to handle this differently.
                     return self.state
-
-                self.state.current_stage = ResearchStage.HUNTING_REVIEW
+                self._on_hunted(results)
 
             # 3. CHECKPOINT (Stop for Human)
             elif self.state.current_stage == ResearchStage.HUNTING_REVIEW:
-                print("\n[!] CHECKPOINT REACHED: Review Competitors")
-                self._print_competitors()
+                self._checkpoint()
                 # Break the loop to return control to the main interface (main.py)
-                return self.state 
+                return self.state
 
             # 4. MINING (Call Agent B)
             elif self.state.current_stage == ResearchStage.MINING:
                 print(">> Supervisor: Competitors approved. Calling 'The Miner'...")
-                
+                self._report("competitors")
+
                 try:
                     # Pass the APPROVED competitors to the miner
-                    pains = self.miner.mine(self.state.competitors)
-                    self.state.pain_points = pains
-                    self.state.add_log(f"Miner found {len(pains)} pain points.")
-                    
-                    # Print results for you to see
-                    print(f"\n--- [MINING COMPLETE] Found {len(pains)} signals ---")
-                    for p in pains[:3]: # Show top 3
-                        print(f"   * {p.pain_category}: \"{p.quote}\"")
-                        
+                    with self._stage_span():
+                        self._on_mined(self.miner.mine(self.state.competitors))
                 except Exception as e:
                     print(f"Error during Mining: {e}")
                 self.state.current_stage = ResearchStage.VALIDATING
@@ -82,27 +115,182 @@ class SupervisorAgent:
             # 5. VALIDATING (Call Agent C)
             elif self.state.current_stage == ResearchStage.VALIDATING:
                 print(">> Supervisor: Pains found. Calling 'The Validator'...")
-                
+
                 try:
-                    ideas = self.validator.validate(self.state.pain_points)
-                    self.state.final_ideas = ideas
-                    
-                    # --- NEW: GENERATE REPORT ---
-                    print("\n>> Supervisor: Generating Final Report...")
-                    filepath = self.reporter.save_report(self.state)
-                    print(f"✅ REPORT SAVED: {filepath}")
-                    # ----------------------------
-                        
+                    with self._stage_span():
+                        self._on_validated(self.validator.validate(self.state.pain_points))
                 except Exception as e:
-                    print(f"Error during Validation/Reporting: {e}")
+                    print(f"Error during Validation: {e}")
+                self.state.current_stage = ResearchStage.ARCHITECTING
 
+            # 6. ARCHITECTING (Call Agent D) + Report
+            elif self.state.current_stage == ResearchStage.ARCHITECTING:
+                try:
+                    if self.state.final_ideas:
+                        print(">> Supervisor: Ideas scored. Calling 'The Architect'...")
+                        with self._stage_span():
+                            self.state.product_spec = self.architect.create_spec(self.state.final_ideas[0], self.state.pain_points)
+                except Exception as e:
+                    print(f"Error during Architecting: {e}")
                 self.state.current_stage = ResearchStage.COMPLETED
-                
-        print("--- Workflow Completed ---")
+                self._save_report()
+
+        self._save_checkpoint()
+        self._finish()
+        return self.state
+
+    async def arun(self):
+        """Async version of run(): same stages and HITL stop, but every network
+        call is awaited so many supervisors can share one event loop."""
+        while self.state.current_stage != ResearchStage.COMPLETED:
+            self._save_checkpoint()
+
+            if self.state.current_stage == ResearchStage.INIT:
+                self._start()
+
+            elif self.state.current_stage == ResearchStage.HUNTING:
+                print(">> Supervisor: Dispatching Hunter Agent...")
+                try:
+                    with self._stage_span():
+                        results = await self.hunter.ahunt(self.state.niche)
+                except Exception as e:
+                    print(f"Error during Hunting: {e}")
+                    return self.state
+                self._on_hunted(results)
+
+            elif self.state.current_stage == ResearchStage.HUNTING_REVIEW:
+                self._checkpoint()
+                return self.state
+
+            elif self.state.current_stage == ResearchStage.MINING:
+                print(">> Supervisor: Competitors approved. Calling 'The Miner'...")
+                self._report("competitors")
+                try:
+                    with self._stage_span():
+                        self._on_mined(await self.miner.amine(self.state.competitors))
+                except Exception as e:
+                    print(f"Error during Mining: {e}")
+                self.state.current_stage = ResearchStage.VALIDATING
+
+            elif self.state.current_stage == ResearchStage.VALIDATING:
+                print(">> Supervisor: Pains found. Calling 'The Validator'...")
+                try:
+                    with self._stage_span():
+                        self._on_validated(await self.validator.avalidate(self.state.pain_points))
+                except Exception as e:
+                    print(f"Error during Validation: {e}")
+                self.state.current_stage = ResearchStage.ARCHITECTING
+
+            elif self.state.current_stage == ResearchStage.ARCHITECTING:
+                try:
+                    if self.state.final_ideas:
+                        print(">> Supervisor: Ideas scored. Calling 'The Architect'...")
+                        with self._stage_span():
+                            self.state.product_spec = await self.architect.acreate_spec(self.state.final_ideas[0], self.state.pain_points)
+                except Exception as e:
+                    print(f"Error during Architecting: {e}")
+                self.state.current_stage = ResearchStage.COMPLETED
+                await asyncio.to_thread(self._save_report)
+
+        self._save_checkpoint()
+        self._finish()
         return self.state
 
+    # --- Stage bookkeeping shared by run() and arun() ---
+
+    @contextmanager
+    def _stage_span(self):
+        """Times the current stage; external calls made inside it (including on
+        worker threads) are recorded as child spans on the same tracer."""
+        with use_tracer(self.tracer), self.tracer.span(f"stage.{self.state.current_stage.value}", kind="stage") as attrs:
+            yield attrs
+
+    def _save_checkpoint(self):
+        # Only write when the stage moved (or the HITL step changed it for us)
+        if self.state.current_stage == self._saved_stage:
+            return
+        try:
+            self.checkpoints.save(self.state)
+            self._saved_stage = self.state.current_stage
+        except OSError as e:
+            print(f"   [Checkpoint] Warning: Could not save {self.state.project_id} ({e}).")
+
+    def _start(self):
+        self.state.add_log("Starting Research. Transitioning to HUNTING.")
+        self.state.current_stage = ResearchStage.HUNTING
+
+    def _on_hunted(self, results):
+        self.state.competitors = results
+        self.state.add_log(f"Hunter found {len(results)} competitors.")
+        self.state.current_stage = ResearchStage.HUNTING_REVIEW
+
+    def _checkpoint(self):
+        print("\n[!] CHECKPOINT REACHED: Review Competitors")
+        self._print_competitors()
+
+    def _on_mined(self, pains):
+        raw_count = len(pains)
+        # Merge near-duplicates and rank before anything downstream pays for them
+        pains = self.clusterer.cluster(pains)
+        self.state.pain_points = pains
+        self.state.add_log(f"Miner found {raw_count} pain points ({len(pains)} distinct).")
+
+        # Print results for you to see
+        print(f"\n--- [MINING COMPLETE] Found {len(pains)} signals ---")
+        for p in pains[:3]: # Show top 3
+            print(f"   * {p.pain_category}: \"{p.quote}\"")
+        self._report("pains")
+
+    def _on_validated(self, ideas):
+        self.state.final_ideas = ideas
+        self.state.add_log(f"Validator scored {len(ideas)} ideas.")
+        self._report("ideas")
+
+    def _report(self, section: str):
+        """Streams `section` (and any earlier one not yet written, e.g. after a
+        failed stage or a resume) into the report on disk."""
+        try:
+            if self.report_path is None:
+                self.report_path = self.reporter.start_report(self.state)
+            for name in SECTIONS[:SECTIONS.index(section) + 1]:
+                if name not in self._report_sections:
+                    self.reporter.append_section(self.report_path, self.state, name)
+                    self._report_sections.add(name)
+        except Exception as e:
+            print(f"   [Report] Warning: Could not write the {section} section ({e}).")
+
+    def _save_report(self):
+        try:
+            print("\n>> Supervisor: Finalizing Report...")
+            self._report(SECTIONS[-1])
+            self.reporter.finish_report(self.report_path, self.state)
+            print(f"✅ REPORT SAVED: {self.report_path}")
+        except Exception as e:
+            print(f"Error during Reporting: {e}")
+
+        # Index the structured results so later runs can reuse them
+        try:
+            get_knowledge_store().save_state(self.state)
+        except Exception as e:
+            print(f"Error saving to knowledge store: {e}")
+
+    def _finish(self):
+        print("--- Workflow Completed ---")
+        for s in self.state.spans:
+            if s.kind == "stage":
+                print(f"   [Timing] {s.name}: {s.duration_ms / 1000:.1f}s")
+        print(f"   [Calls] {self.tracer.summary()}")
+        try:
+            spans_path = self.reporter.paths_for(self.state)["spans"]
+            export_spans_jsonl(self.state, spans_path)
+            print(f"   [Trace] {spans_path}")
+        except OSError as e:
+            print(f"   [Trace] Warning: Could not export spans ({e}).")
+        print(f"   [SerpApi cache] {get_search_cache().stats()} | coalesced: {coalesced_searches()}")
+        print(f"   [LLM] {get_llm_client().stats()}")
+
     def _print_competitors(self):
         print(f"found {len(self.state.competitors)} competitors:")
         for i, comp in enumerate(self.state.competitors):
             print(f"  {i+1}. {comp.name} ({comp.url})")
-        print("\nType 'ok' to proceed or 'reject [number]' (logic to be added) to filter.")
\ No newline at end of file
+        print("\nType 'ok' to proceed or 'reject [number]' (logic to be added) to filter.")